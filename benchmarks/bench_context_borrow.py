@@ -0,0 +1,69 @@
+"""
+Benchmark the throughput of borrowing values from a `Context`.
+
+Each iteration puts a value in a fresh context, then borrows it `borrows` times,
+unwrapping and dropping it each time, both with `get()` and `get_nowait()`.
+
+Usage: python benchmarks/bench_context_borrow.py [--backend asyncio|trio]
+"""
+
+from __future__ import annotations
+
+import argparse
+from time import perf_counter
+
+import anyio
+
+from fps import Context
+
+
+class Target:
+    pass
+
+
+async def bench_put(contexts: int) -> float:
+    t0 = perf_counter()
+    for _ in range(contexts):
+        async with Context() as context:
+            context.put(Target())
+    return perf_counter() - t0
+
+
+async def bench_get(borrows: int) -> float:
+    async with Context() as context:
+        context.put(Target())
+        t0 = perf_counter()
+        for _ in range(borrows):
+            value = await context.get(Target)
+            value.unwrap()
+            value.drop()
+        return perf_counter() - t0
+
+
+async def bench_get_nowait(borrows: int) -> float:
+    async with Context() as context:
+        context.put(Target())
+        t0 = perf_counter()
+        for _ in range(borrows):
+            value = context.get_nowait(Target)
+            value.unwrap()
+            value.drop()
+        return perf_counter() - t0
+
+
+async def main() -> None:
+    contexts = 10_000
+    borrows = 100_000
+    elapsed = await bench_put(contexts)
+    print(f"{'put':>12}: {contexts / elapsed:>12,.0f} ops/s")
+    elapsed = await bench_get(borrows)
+    print(f"{'get':>12}: {borrows / elapsed:>12,.0f} ops/s")
+    elapsed = await bench_get_nowait(borrows)
+    print(f"{'get_nowait':>12}: {borrows / elapsed:>12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="asyncio")
+    args = parser.parse_args()
+    anyio.run(main, backend=args.backend)
@@ -0,0 +1,66 @@
+"""
+Benchmark `Context.get_nowait()` in nested contexts.
+
+A value is put in the root context, and borrowed with `get_nowait()` from the innermost
+context of a chain of `depth` nested contexts, so that every lookup has to go through
+all the ancestors. A lookup for a missing value is also measured.
+
+Usage: python benchmarks/bench_context_get_nowait.py [--backend asyncio|trio]
+"""
+
+from __future__ import annotations
+
+import argparse
+from contextlib import AsyncExitStack
+from time import perf_counter
+
+import anyio
+
+from fps import Context
+
+
+class Target:
+    pass
+
+
+class Missing:
+    pass
+
+
+async def run_once(depth: int, borrows: int) -> tuple[float, float]:
+    async with AsyncExitStack() as stack:
+        root = await stack.enter_async_context(Context())
+        root.put(Target())
+        context = root
+        for _ in range(depth - 1):
+            context = await stack.enter_async_context(Context())
+
+        t0 = perf_counter()
+        for _ in range(borrows):
+            value = context.get_nowait(Target)
+            value.drop()
+        hit = perf_counter() - t0
+
+        t0 = perf_counter()
+        for _ in range(borrows):
+            try:
+                context.get_nowait(Missing)
+            except RuntimeError:
+                pass
+        miss = perf_counter() - t0
+    return hit, miss
+
+
+async def main() -> None:
+    borrows = 100_000
+    print(f"{'depth':>6} {'hit (ops/s)':>14} {'miss (ops/s)':>14}")
+    for depth in (1, 5, 20):
+        hit, miss = await run_once(depth, borrows)
+        print(f"{depth:>6} {borrows / hit:>14,.0f} {borrows / miss:>14,.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="asyncio")
+    args = parser.parse_args()
+    anyio.run(main, backend=args.backend)
@@ -0,0 +1,71 @@
+"""
+Benchmark the wake-ups of tasks waiting for values in a `Context`.
+
+`waiters` tasks wait for `waiters` distinct types, and `matching` extra tasks wait
+for a single type. Then the single type is published, and we measure the time it
+takes for its waiters to get their value. It should scale with `matching`, not
+with `waiters`.
+
+Usage: python benchmarks/bench_context_waiters.py [--backend asyncio|trio]
+"""
+
+from __future__ import annotations
+
+import argparse
+from time import perf_counter
+
+import anyio
+from anyio import Event, create_task_group, wait_all_tasks_blocked
+
+from fps import Context
+
+
+class Target:
+    pass
+
+
+async def run_once(waiters: int, matching: int) -> float:
+    types = [type(f"Type{i}", (), {}) for i in range(waiters)]
+    done = 0
+    all_done = Event()
+
+    async with Context() as context, create_task_group() as tg:
+
+        async def wait_for(value_type: type, count: bool) -> None:
+            nonlocal done
+            value = await context.get(value_type)
+            value.drop()
+            if count:
+                done += 1
+                if done == matching:
+                    all_done.set()
+
+        for value_type in types:
+            tg.start_soon(wait_for, value_type, False)
+        for _ in range(matching):
+            tg.start_soon(wait_for, Target, True)
+        await wait_all_tasks_blocked()
+
+        t0 = perf_counter()
+        context.put(Target())
+        await all_done.wait()
+        elapsed = perf_counter() - t0
+
+        for value_type in types:
+            context.put(value_type())
+    return elapsed
+
+
+async def main() -> None:
+    print(f"{'waiters':>8} {'matching':>8} {'time (ms)':>10}")
+    for waiters in (0, 100, 1000, 10000):
+        for matching in (1, 10, 100):
+            elapsed = await run_once(waiters, matching)
+            print(f"{waiters:>8} {matching:>8} {elapsed * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="asyncio")
+    args = parser.parse_args()
+    anyio.run(main, backend=args.backend)
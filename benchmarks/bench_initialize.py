@@ -0,0 +1,92 @@
+"""
+Benchmark the initialization of an application whose modules are in many packages.
+
+A tree of modules is generated: every top-level module and its submodules come from their
+own package, and importing each of its Python modules takes `--import-delay` seconds
+outside of the GIL, like reading from a slow disk or initializing a native extension does.
+The application is configured with the module types as strings, and we measure the time
+it takes to initialize it, with imports done one after the other and in a thread pool.
+Each run imports freshly generated packages.
+
+Usage: python benchmarks/bench_initialize.py [--backend asyncio|trio]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import anyio
+
+from fps import Module, get_root_module, initialize
+
+MODULE_SOURCE = """\
+from time import sleep
+
+from fps import Module
+
+sleep({import_delay})
+
+
+class MyModule(Module):
+    pass
+"""
+
+
+def generate(
+    path: Path, prefix: str, packages: int, modules: int, import_delay: float
+) -> dict:
+    root_modules = {}
+    for package_idx in range(packages):
+        package = f"{prefix}_{package_idx}"
+        (path / package).mkdir()
+        (path / package / "__init__.py").write_text("")
+        for module_idx in range(modules):
+            (path / package / f"module{module_idx}.py").write_text(
+                MODULE_SOURCE.format(import_delay=import_delay)
+            )
+        root_modules[f"module{package_idx}"] = {
+            "type": f"{package}.module0:MyModule",
+            "modules": {
+                f"module{module_idx}": {
+                    "type": f"{package}.module{module_idx}:MyModule"
+                }
+                for module_idx in range(1, modules)
+            },
+        }
+    return {"root": {"type": Module, "modules": root_modules}}
+
+
+async def main(packages: int, modules: int, import_delay: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sys.path.insert(0, tmp_dir)
+        elapsed = {}
+        for parallel_imports in (False, True):
+            prefix = f"bench_{'parallel' if parallel_imports else 'serial'}"
+            config = generate(Path(tmp_dir), prefix, packages, modules, import_delay)
+            root_module = get_root_module(config)
+            t0 = perf_counter()
+            initialize(root_module, parallel_imports=parallel_imports)
+            elapsed[parallel_imports] = perf_counter() - t0
+            async with root_module:
+                pass
+    print(f"modules: {packages * modules:,} in {packages:,} packages")
+    print(f"import delay: {import_delay * 1000:.1f} ms")
+    print(f"serial imports: {elapsed[False]:.3f} s")
+    print(f"parallel imports: {elapsed[True]:.3f} s")
+    print(f"speedup: {elapsed[False] / elapsed[True]:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="asyncio")
+    parser.add_argument("--packages", type=int, default=20)
+    parser.add_argument("--modules", type=int, default=10)
+    parser.add_argument("--import-delay", type=float, default=0.002)
+    args = parser.parse_args()
+    anyio.run(
+        main, args.packages, args.modules, args.import_delay, backend=args.backend
+    )
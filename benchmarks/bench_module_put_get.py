@@ -0,0 +1,65 @@
+"""
+Benchmark the throughput of `Module.put` and `Module.get` when debug logging is off.
+
+A module publishes many values (each with its own key) and borrows them back. Logging is
+set up at the "INFO" level. With the debug logging gate, the debug logs of `put` and `get`
+are skipped. Without it, they are built and processed by structlog, and then dropped by
+the standard library's `logging`, as before the gate existed.
+
+Usage: python benchmarks/bench_module_put_get.py [--backend asyncio|trio]
+"""
+
+from __future__ import annotations
+
+import argparse
+from time import perf_counter
+
+import anyio
+
+import fps._logging
+from fps import Module, configure_logging
+
+
+class Foo:
+    pass
+
+
+class Root(Module):
+    def __init__(self, name: str, values: int) -> None:
+        super().__init__(name)
+        self.values = values
+        self.elapsed: dict[str, float] = {}
+
+    async def start(self) -> None:
+        t0 = perf_counter()
+        for key in range(self.values):
+            self.put(Foo(), key=key)
+        t1 = perf_counter()
+        foos = [await self.get(Foo, key=key) for key in range(self.values)]
+        t2 = perf_counter()
+        self.elapsed = {"put": t1 - t0, "get": t2 - t1}
+        for foo in foos:
+            self.drop(foo)
+        self.exit_app()
+
+
+async def main(values: int) -> None:
+    for gate in (False, True):
+        configure_logging("INFO")
+        if not gate:
+            # emulate the debug logs being built regardless of the logging level
+            fps._logging._debug_enabled = True
+        root = Root("root", values)
+        async with root:
+            pass
+        print(f"debug logging gate: {'on' if gate else 'off'}")
+        for name, elapsed in root.elapsed.items():
+            print(f"  {name}: {values / elapsed:,.0f} values/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="asyncio")
+    parser.add_argument("--values", type=int, default=10_000)
+    args = parser.parse_args()
+    anyio.run(main, args.values, backend=args.backend)
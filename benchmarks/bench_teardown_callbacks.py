@@ -0,0 +1,57 @@
+"""
+Benchmark the teardown of many short-lived contexts, each with its own teardown callbacks.
+
+Every context puts a value with a closure as its teardown callback, and registers a bound
+method of a per-context object as a context teardown callback, as modules do. The callbacks
+are called when the contexts are closed, which counts their parameters. We measure the time
+it takes, and how many services (and their payload) are still alive after all contexts are
+closed.
+
+Usage: python benchmarks/bench_teardown_callbacks.py [--backend asyncio|trio]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+from time import perf_counter
+
+import anyio
+
+from fps import Context
+
+
+class Service:
+    def __init__(self) -> None:
+        self.payload = bytearray(1024)
+
+    def close(self) -> None:
+        pass
+
+
+async def main(contexts: int) -> None:
+    t0 = perf_counter()
+    for _ in range(contexts):
+        service = Service()
+
+        def teardown_callback(exc_value, service=service):
+            pass
+
+        async with Context() as context:
+            context.put(service, teardown_callback=teardown_callback)
+            context.add_teardown_callback(service.close)
+    elapsed = perf_counter() - t0
+    del service, teardown_callback, context
+    gc.collect()
+    alive = sum(isinstance(obj, Service) for obj in gc.get_objects())
+    print(f"contexts: {contexts:,}")
+    print(f"time: {elapsed:.2f} s ({contexts / elapsed:,.0f} contexts/s)")
+    print(f"services still alive: {alive:,} (1 KiB of payload each)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default="asyncio")
+    parser.add_argument("--contexts", type=int, default=100_000)
+    args = parser.parse_args()
+    anyio.run(main, args.contexts, backend=args.backend)
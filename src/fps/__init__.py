@@ -1,14 +1,62 @@
-from ._context import Context as Context
-from ._context import SharedValue as SharedValue
-from ._context import Value as Value
-from ._context import current_context as current_context
-from ._context import put as put
-from ._context import get as get
-from ._context import get_nowait as get_nowait
-from ._module import Module as Module
-from ._module import initialize as initialize
-from ._config import get_root_module as get_root_module
-from ._config import merge_config as merge_config
-from ._signal import Signal as Signal
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from ._context import Context as Context
+    from ._context import SharedValue as SharedValue
+    from ._context import SharedValuePool as SharedValuePool
+    from ._context import SharedValueStatistics as SharedValueStatistics
+    from ._context import Value as Value
+    from ._context import current_context as current_context
+    from ._context import put as put
+    from ._context import get as get
+    from ._context import get_nowait as get_nowait
+    from ._module import Module as Module
+    from ._module import initialize as initialize
+    from ._config import get_root_module as get_root_module
+    from ._config import merge_config as merge_config
+    from ._importer import invalidate_entry_points as invalidate_entry_points
+    from ._logging import configure_logging as configure_logging
+    from ._signal import Signal as Signal
+    from ._trace import trace_startup as trace_startup
 
 __version__ = "0.6.5"
+
+# the objects are imported from their modules when they are first accessed,
+# so that importing FPS does not import its dependencies
+_lazy_imports = {
+    "Context": "._context",
+    "SharedValue": "._context",
+    "SharedValuePool": "._context",
+    "SharedValueStatistics": "._context",
+    "Value": "._context",
+    "current_context": "._context",
+    "put": "._context",
+    "get": "._context",
+    "get_nowait": "._context",
+    "Module": "._module",
+    "initialize": "._module",
+    "get_root_module": "._config",
+    "merge_config": "._config",
+    "invalidate_entry_points": "._importer",
+    "configure_logging": "._logging",
+    "Signal": "._signal",
+    "trace_startup": "._trace",
+}
+
+__all__ = ["__version__", *_lazy_imports]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _lazy_imports.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *_lazy_imports])
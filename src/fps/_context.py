@@ -1,25 +1,45 @@
 from __future__ import annotations
 
 import sys
-from collections.abc import Callable, Awaitable
+from collections import deque
+from collections.abc import Callable, Awaitable, Hashable
 from contextvars import ContextVar
-from functools import lru_cache, partial
-from inspect import isawaitable, signature
-from types import TracebackType
+from dataclasses import dataclass
+from functools import partial
+from inspect import Parameter, isawaitable, iscoroutine, signature
+from time import perf_counter
+from types import FunctionType, MethodType, TracebackType
 from typing import (
     Any,
     Generic,
     Iterable,
+    Literal,
     TypeVar,
 )
+from weakref import WeakKeyDictionary, ref
+
+from anyio import (
+    Event,
+    Lock,
+    create_task_group,
+    fail_after,
+    from_thread,
+    move_on_after,
+)
 
-from anyio import Event, create_task_group, fail_after, move_on_after
+from ._logging import get_logger
 
 if sys.version_info < (3, 11):
     from exceptiongroup import ExceptionGroup  # pragma: no cover
 
 
+log = get_logger(__name__)
+
 T = TypeVar("T")
+_BorrowMode = Literal["shared", "exclusive"]
+_MISSING: Any = object()
+# the interval (in seconds) at which waiters look for orphaned borrows
+_ORPHAN_POLL_INTERVAL = 0.1
 _current_context: ContextVar[Context] = ContextVar("_current_context")
 
 
@@ -28,14 +48,30 @@ class Value(Generic[T]):
     A `Value` can be obtained from a shared value by calling `await shared_value.get()`,
     and can be dropped by calling `value.drop()`. The inner value can be accessed by
     calling `value.unwrap()`, unless it was already dropped.
+    If the borrow was leased, the value is dropped automatically when the lease expires.
     """
 
-    def __init__(self, shared_value: SharedValue[T]) -> None:
+    __slots__ = ("_shared_value", "_value", "_generation", "_ref", "__weakref__")
+
+    def __init__(self, shared_value: SharedValue[T], value: T) -> None:
         """
         Args:
             shared_value: The shared value this `Value` refers to.
+            value: The inner value.
         """
         self._shared_value = shared_value
+        self._value = value
+        self._generation = shared_value._generation
+        self._ref: ref[Value[T]] | None = None
+
+    @property
+    def generation(self) -> int:
+        """
+        Returns:
+            The generation of the shared value when it was borrowed, which is incremented
+                every time the shared value is replaced.
+        """
+        return self._generation
 
     def __enter__(self) -> T:
         return self.unwrap()
@@ -58,10 +94,10 @@ class Value(Generic[T]):
         Returns:
             The inner value.
         """
-        if self not in self._shared_value._borrowers:
+        if self._ref is None:
             raise RuntimeError("Already dropped")
 
-        return self._shared_value._value
+        return self._value
 
     def drop(self) -> None:
         """
@@ -69,16 +105,59 @@ class Value(Generic[T]):
         """
         self._shared_value._drop(self)
 
+    def drop_from_thread(self) -> None:
+        """
+        Drop the value from a worker thread, by running `drop()` in the event loop.
+        """
+        from_thread.run_sync(self.drop)
+
 
 class SharedValue(Generic[T]):
     """
     A value that can be shared with so-called borrowers. A borrower borrows a shared value by
     calling `await shared_value.get()`, which returns a `Value`. The shared value can be borrowed
-    any number of times at the same time, unless specified by `max_borrowers`. All borrowers must
+    any number of times at the same time, unless specified by `max_borrowers`, in which case
+    borrowers wait in line and are served in first-in, first-out order. A borrower can also
+    borrow the shared value exclusively with `await shared_value.get(mode="exclusive")`, in
+    which case it waits for all other borrowers to drop their value, and no one else can borrow
+    the shared value until it drops its own. Borrowers that come after a waiting exclusive
+    borrower wait in line behind it, so that exclusive borrowers are not starved by a
+    continuous flow of shared borrowers. All borrowers must
     drop their `Value` before the shared value can be closed. The shared value can be closed
     explicitly by calling `await shared_value.aclose()`, or by using an async context manager.
+
+    To prevent a borrower that never drops its `Value` from holding up the shared value, a
+    borrow can be leased for a number of seconds with `await shared_value.get(lease=seconds)`,
+    or by default with the `lease` argument. A borrow whose lease has expired is reclaimed,
+    as if its `Value` had been dropped. A borrow whose `Value` is garbage-collected without
+    having been dropped is also reclaimed. Reclaimed borrows are logged as warnings.
+
+    The inner value can be replaced with `await shared_value.replace(new_value)`: new borrowers
+    get the new value right away, while existing borrowers keep the old one until they drop it,
+    after which the old value is torn down.
     """
 
+    __slots__ = (
+        "_value",
+        "_max_borrowers",
+        "_teardown_callback",
+        "_close_timeout",
+        "_lease",
+        "_generation",
+        "_borrows",
+        "_orphans",
+        "_record_orphan",
+        "_leased",
+        "_exclusive",
+        "_borrow_requests",
+        "_dropped",
+        "_closing",
+        "_waits",
+        "_total_wait_time",
+        "_max_wait_time",
+        "__weakref__",
+    )
+
     def __init__(
         self,
         value: T,
@@ -87,6 +166,7 @@ class SharedValue(Generic[T]):
         | Callable[..., Awaitable[Any]]
         | None = None,
         close_timeout: float | None = None,
+        lease: float | None = None,
     ) -> None:
         """
         Args:
@@ -94,21 +174,153 @@ class SharedValue(Generic[T]):
             max_borrowers: The number of times the shared value can be borrowed at the same time.
             teardown_callback: The callback to call when closing the shared value.
             close_timeout: The timeout to use when closing the shared value.
+            lease: The default time (in seconds) after which a borrow is reclaimed, if any.
         """
         self._value = value
         self._max_borrowers = max_borrowers
         self._teardown_callback = teardown_callback
         self._close_timeout = close_timeout
-        self._borrowers: set[Value] = set()
-        self._dropped = Event()
-        self._opened = False
+        self._lease = lease
+        self._generation = 0
+        self._borrows: dict[ref[Value], _Borrow] = {}
+        self._orphans: list[ref[Value]] = []
+        # the weakref callback only records the orphaned borrow, since it is called in
+        # whichever thread drops the last reference to the value: it is reclaimed in the
+        # event loop
+        self._record_orphan = self._orphans.append
+        self._leased = 0
+        self._exclusive = False
+        self._borrow_requests: deque[_BorrowRequest] = deque()
+        self._dropped: Event | None = None
         self._closing = False
+        self._waits = 0
+        self._total_wait_time = 0.0
+        self._max_wait_time = 0.0
+
+    def _can_borrow(self, mode: _BorrowMode) -> bool:
+        if mode == "shared":
+            return not self._exclusive and len(self._borrows) < self._max_borrowers
+        if mode == "exclusive":
+            return not self._borrows
+        raise RuntimeError(f'Invalid borrow mode: "{mode}"')
+
+    def _next_value(self) -> T:
+        return self._value
+
+    def _borrow(
+        self,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+        borrower: str | None = None,
+    ) -> Value:
+        value = Value(self, self._next_value())
+        # the borrow is only weakly referenced by the shared value,
+        # so that it can be reclaimed if its value is garbage-collected
+        value._ref = ref(value, self._record_orphan)
+        if lease is None:
+            lease = self._lease
+        if lease is None:
+            deadline = None
+        else:
+            deadline = perf_counter() + lease
+            self._leased += 1
+        exclusive = mode == "exclusive"
+        if exclusive:
+            self._exclusive = True
+        self._borrows[value._ref] = _Borrow(
+            value._value, self._generation, exclusive, deadline, borrower
+        )
+        return value
 
     def _drop(self, borrower: Value) -> None:
-        if borrower in self._borrowers:
-            self._borrowers.remove(borrower)
+        if borrower._ref is not None:
+            borrow = self._borrows.pop(borrower._ref)
+            borrower._ref = None
+            self._release(borrow)
+
+    def _release(self, borrow: _Borrow) -> None:
+        if borrow.exclusive:
+            self._exclusive = False
+        if borrow.deadline is not None:
+            self._leased -= 1
+        # hand the freed slots over to the borrowers that have been waiting the longest
+        while self._borrow_requests and self._can_borrow(self._borrow_requests[0].mode):
+            borrow_request = self._borrow_requests.popleft()
+            borrow_request.value = self._borrow(
+                borrow_request.mode, borrow_request.lease, borrow_request.borrower
+            )
+            borrow_request.event.set()
+        if self._dropped is not None:
             self._dropped.set()
+            self._dropped = None
+
+    def _dropped_event(self) -> Event:
+        # the event is only created when waiting, so that dropping a value is cheap
+        if self._dropped is None:
             self._dropped = Event()
+        return self._dropped
+
+    def _reclaim_orphans(self) -> None:
+        while self._orphans:
+            borrow = self._borrows.pop(self._orphans.pop(0), None)
+            if borrow is not None:
+                log.warning(
+                    "Reclaimed value that was not dropped", borrower=borrow.borrower
+                )
+                self._release(borrow)
+
+    def _reclaim_expired(self) -> float:
+        # reclaim the borrows whose lease has expired,
+        # and return the time at which the next lease expires
+        next_deadline = float("inf")
+        if not self._leased:
+            return next_deadline
+        now = perf_counter()
+        for value_ref, borrow in list(self._borrows.items()):
+            if borrow.deadline is None:
+                continue
+            if borrow.deadline > now:
+                next_deadline = min(next_deadline, borrow.deadline)
+            elif self._borrows.pop(value_ref, None) is not None:
+                value = value_ref()
+                if value is not None:
+                    value._ref = None
+                log.warning(
+                    "Reclaimed value whose lease expired", borrower=borrow.borrower
+                )
+                self._release(borrow)
+        return next_deadline
+
+    async def _wait(self, event: Event) -> None:
+        # wait for the event, reclaiming the orphaned borrows
+        # and the borrows whose lease expires in the meantime
+        while True:
+            if self._orphans:
+                self._reclaim_orphans()
+            if event.is_set():
+                return
+            next_deadline = self._reclaim_expired()
+            # borrows can be orphaned at any time, in any thread
+            with move_on_after(
+                min(next_deadline - perf_counter(), _ORPHAN_POLL_INTERVAL)
+            ):
+                await event.wait()
+
+    def statistics(self) -> SharedValueStatistics:
+        """
+        Returns:
+            Statistics about the borrowers of the shared value.
+        """
+        if self._orphans:
+            self._reclaim_orphans()
+        return SharedValueStatistics(
+            borrowers=len(self._borrows),
+            max_borrowers=self._max_borrowers,
+            waiting=len(self._borrow_requests),
+            waits=self._waits,
+            total_wait_time=self._total_wait_time,
+            max_wait_time=self._max_wait_time,
+        )
 
     async def __aenter__(self) -> SharedValue:
         return self
@@ -121,41 +333,86 @@ class SharedValue(Generic[T]):
     ) -> None:
         await self.aclose(_exc_type=exc_type, _exc_value=exc_value, _exc_tb=exc_tb)
 
-    async def get(self, timeout: float = float("inf")) -> Value:
+    async def get(
+        self,
+        timeout: float = float("inf"),
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+        *,
+        _borrower: str | None = None,
+    ) -> Value:
         """
         Borrow the shared value.
 
         Args:
             timeout: The time to wait to borrow the shared value.
+            mode: Whether to borrow the shared value along with other borrowers ("shared"),
+                or as its only borrower ("exclusive").
+            lease: The time (in seconds) after which the borrow is reclaimed, if not dropped.
+                If not provided, the shared value's default lease is used.
 
         Returns:
             The borrowed value.
 
         Raises:
             TimeoutError: If the value could not be borrowed in time.
+            RuntimeError: If the borrow mode is invalid.
         """
-        value = Value(self)
-        with fail_after(timeout):
-            while True:
-                if len(self._borrowers) < self._max_borrowers:
-                    self._borrowers.add(value)
-                    return value
-                await self._dropped.wait()
-
-    def get_nowait(self) -> Value:
+        if self._orphans:
+            self._reclaim_orphans()
+        if self._can_borrow(mode) and not self._borrow_requests:
+            return self._borrow(mode, lease, _borrower)
+
+        # wait in line for a borrower to drop their value
+        borrow_request = _BorrowRequest(mode, lease, _borrower)
+        self._borrow_requests.append(borrow_request)
+        t0 = perf_counter()
+        try:
+            with fail_after(timeout):
+                await self._wait(borrow_request.event)
+        except BaseException:
+            if borrow_request.value is None:
+                self._borrow_requests.remove(borrow_request)
+            else:
+                # the value was handed over to us, give it to the next borrower
+                borrow_request.value.drop()
+            raise
+
+        wait_time = perf_counter() - t0
+        self._waits += 1
+        self._total_wait_time += wait_time
+        self._max_wait_time = max(self._max_wait_time, wait_time)
+        assert borrow_request.value is not None
+        return borrow_request.value
+
+    def get_nowait(
+        self,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+        *,
+        _borrower: str | None = None,
+    ) -> Value:
         """
         Borrow the shared value.
 
+        Args:
+            mode: Whether to borrow the shared value along with other borrowers ("shared"),
+                or as its only borrower ("exclusive").
+            lease: The time (in seconds) after which the borrow is reclaimed, if not dropped.
+                If not provided, the shared value's default lease is used.
+
         Returns:
             The borrowed value.
 
         Raises:
             RuntimeError: If the shared value cannot be borrowed.
         """
-        if len(self._borrowers) < self._max_borrowers:
-            value = Value(self)
-            self._borrowers.add(value)
-            return value
+        if self._orphans:
+            self._reclaim_orphans()
+        if self._leased:
+            self._reclaim_expired()
+        if self._can_borrow(mode) and not self._borrow_requests:
+            return self._borrow(mode, lease, _borrower)
         raise RuntimeError("Cannot borrow shared value")
 
     async def freed(self, timeout: float = float("inf")) -> None:
@@ -170,9 +427,9 @@ class SharedValue(Generic[T]):
         """
         with fail_after(timeout):
             while True:
-                if not self._borrowers:
+                if not self._borrows:
                     return
-                await self._dropped.wait()
+                await self._wait(self._dropped_event())
 
     async def aclose(
         self,
@@ -203,12 +460,391 @@ class SharedValue(Generic[T]):
         with move_on_after(timeout) as scope:
             await self.freed()
 
-        if self._teardown_callback is not None:
-            await call(self._teardown_callback, _exc_value)
+        await self._teardown(_exc_value)
 
         if scope.cancelled_caught:
             raise TimeoutError
 
+    async def replace(
+        self,
+        value: T,
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+    ) -> None:
+        """
+        Replace the inner value. New borrowers get the new value right away, while existing
+        borrowers keep the old value until they drop it. The old value is then torn down with
+        its teardown callback, and this returns.
+
+        Args:
+            value: The new inner value.
+            teardown_callback: The callback to call when closing the shared value, for the
+                new inner value.
+        """
+        old_value = self._value
+        old_teardown_callback = self._teardown_callback
+        generation = self._generation
+        self._value = value
+        self._teardown_callback = teardown_callback
+        self._generation += 1
+        while any(borrow.generation == generation for borrow in self._borrows.values()):
+            await self._wait(self._dropped_event())
+        if old_teardown_callback is not None:
+            await self._call_teardown_callback(old_teardown_callback, old_value, None)
+
+    async def _teardown(self, exc_value: BaseException | None) -> None:
+        if self._teardown_callback is not None:
+            await self._call_teardown_callback(
+                self._teardown_callback, self._value, exc_value
+            )
+
+    async def _call_teardown_callback(
+        self,
+        teardown_callback: Callable[..., Any] | Callable[..., Awaitable[Any]],
+        value: T,
+        exc_value: BaseException | None,
+    ) -> None:
+        await call(teardown_callback, exc_value)
+
+
+class _LazySharedValue(SharedValue[T]):
+    # A shared value that is built by a factory when it is first borrowed.
+
+    __slots__ = ("_factory", "_build_lock")
+
+    def __init__(
+        self,
+        factory: Callable[[], T] | Callable[[], Awaitable[T]],
+        max_borrowers: float = float("inf"),
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+        lease: float | None = None,
+    ) -> None:
+        super().__init__(
+            _MISSING,
+            max_borrowers=max_borrowers,
+            teardown_callback=teardown_callback,
+            lease=lease,
+        )
+        self._factory = factory
+        self._build_lock = Lock()
+
+    async def get(
+        self,
+        timeout: float = float("inf"),
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+        *,
+        _borrower: str | None = None,
+    ) -> Value:
+        with fail_after(timeout):
+            if self._value is _MISSING:
+                # concurrent first borrowers wait for a single build
+                async with self._build_lock:
+                    if self._value is _MISSING:
+                        value = self._factory()
+                        if isawaitable(value):
+                            value = await value
+                        self._value = value
+            return await super().get(mode=mode, lease=lease, _borrower=_borrower)
+
+    def get_nowait(
+        self,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+        *,
+        _borrower: str | None = None,
+    ) -> Value:
+        if self._value is _MISSING:
+            value = self._factory()
+            if isawaitable(value):
+                # the value can only be built by awaiting get()
+                if iscoroutine(value):
+                    value.close()
+                raise RuntimeError("Cannot borrow shared value")
+            self._value = value
+        return super().get_nowait(mode, lease, _borrower=_borrower)
+
+    async def _call_teardown_callback(
+        self,
+        teardown_callback: Callable[..., Any] | Callable[..., Awaitable[Any]],
+        value: T,
+        exc_value: BaseException | None,
+    ) -> None:
+        if value is not _MISSING:
+            await call(teardown_callback, value, exc_value)
+
+
+class SharedValuePool(SharedValue[T]):
+    """
+    A pool of interchangeable values that can be shared with borrowers. Borrowing from the pool
+    with `await pool.get()` returns a `Value` wrapping an idle instance, and dropping the `Value`
+    returns the instance to the pool. Instances are created on demand by the `factory`, up to
+    `max_size` instances, and the pool is filled with `min_size` instances when it is first
+    borrowed from. When the pool is full, borrowers wait in line for an instance to be returned.
+    Instances that have been idle for longer than `idle_timeout` are torn down, as long as the pool
+    keeps at least `min_size` instances.
+    """
+
+    __slots__ = (
+        "_factory",
+        "_min_size",
+        "_idle_timeout",
+        "_idle",
+        "_size",
+        "_filled",
+        "_fill_lock",
+    )
+
+    def __init__(
+        self,
+        factory: Callable[[], T] | Callable[[], Awaitable[T]],
+        min_size: int = 0,
+        max_size: float = float("inf"),
+        idle_timeout: float | None = None,
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+        close_timeout: float | None = None,
+        lease: float | None = None,
+    ) -> None:
+        """
+        Args:
+            factory: The (sync or async) callable that creates a new instance.
+            min_size: The minimum number of instances in the pool.
+            max_size: The maximum number of instances in the pool.
+            idle_timeout: The time (in seconds) after which an idle instance is torn down.
+            teardown_callback: The callback to call when an instance is torn down. It is
+                passed the instance and the exception that caused the teardown, if any.
+            close_timeout: The timeout to use when closing the pool.
+            lease: The default time (in seconds) after which a borrowed instance is returned
+                to the pool, if any.
+        """
+        if min_size > max_size:
+            raise RuntimeError("The minimum size of the pool exceeds its maximum size")
+        super().__init__(
+            _MISSING,
+            max_borrowers=max_size,
+            teardown_callback=teardown_callback,
+            close_timeout=close_timeout,
+            lease=lease,
+        )
+        self._factory = factory
+        self._min_size = min_size
+        self._idle_timeout = idle_timeout
+        self._idle: deque[tuple[T, float]] = deque()
+        self._size = 0
+        self._filled = False
+        self._fill_lock = Lock()
+
+    @property
+    def size(self) -> int:
+        """
+        Returns:
+            The number of instances in the pool, whether they are borrowed or idle.
+        """
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """
+        Returns:
+            The number of idle instances in the pool.
+        """
+        return len(self._idle)
+
+    def _next_value(self) -> T:
+        # reuse the most recently returned instance, if any,
+        # so that the least recently used ones can be evicted
+        return self._idle.pop()[0] if self._idle else _MISSING
+
+    def _release(self, borrow: _Borrow) -> None:
+        if borrow.value is not _MISSING:
+            self._idle.append((borrow.value, perf_counter()))
+        super()._release(borrow)
+
+    async def get(
+        self,
+        timeout: float = float("inf"),
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+        *,
+        _borrower: str | None = None,
+    ) -> Value:
+        """
+        Borrow an instance from the pool. If there is no idle instance, a new one is created,
+        unless the pool is full, in which case this waits for an instance to be returned.
+
+        Args:
+            timeout: The time to wait to borrow an instance.
+            mode: Ignored, since an instance is always borrowed by a single borrower.
+            lease: The time (in seconds) after which the instance is returned to the pool,
+                if not dropped. If not provided, the pool's default lease is used.
+
+        Returns:
+            The borrowed value.
+
+        Raises:
+            TimeoutError: If an instance could not be borrowed in time.
+        """
+        with fail_after(timeout):
+            await self._fill()
+            await self._evict_idle()
+            value = await super().get(lease=lease, _borrower=_borrower)
+            if value._value is _MISSING:
+                try:
+                    instance = await self._create()
+                except BaseException:
+                    value.drop()
+                    raise
+                value._value = instance
+                borrow = self._borrows.get(value._ref)  # type: ignore[arg-type]
+                if borrow is None:
+                    # the lease expired while the instance was being created
+                    self._idle.append((instance, perf_counter()))
+                else:
+                    borrow.value = instance
+        return value
+
+    def get_nowait(
+        self,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+        *,
+        _borrower: str | None = None,
+    ) -> Value:
+        """
+        Borrow an idle instance from the pool.
+
+        Args:
+            mode: Ignored, since an instance is always borrowed by a single borrower.
+            lease: The time (in seconds) after which the instance is returned to the pool,
+                if not dropped. If not provided, the pool's default lease is used.
+
+        Returns:
+            The borrowed value.
+
+        Raises:
+            RuntimeError: If there is no idle instance in the pool.
+        """
+        if not self._idle:
+            raise RuntimeError("Cannot borrow shared value")
+        return super().get_nowait(lease=lease, _borrower=_borrower)
+
+    async def replace(
+        self,
+        value: T,
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+    ) -> None:
+        """
+        Pools cannot be replaced, since they don't have a single inner value.
+
+        Raises:
+            RuntimeError: Always.
+        """
+        raise RuntimeError("Cannot replace a pool")
+
+    async def _create(self) -> T:
+        self._size += 1
+        try:
+            instance = self._factory()
+            if isawaitable(instance):
+                instance = await instance
+        except BaseException:
+            self._size -= 1
+            raise
+        return instance
+
+    async def _fill(self) -> None:
+        if self._filled:
+            return
+        async with self._fill_lock:
+            while self._size < self._min_size:
+                self._idle.append((await self._create(), perf_counter()))
+            self._filled = True
+
+    async def _evict_idle(self) -> None:
+        if self._idle_timeout is None:
+            return
+        now = perf_counter()
+        while (
+            self._idle
+            and self._size > self._min_size
+            and now - self._idle[0][1] > self._idle_timeout
+        ):
+            instance, _ = self._idle.popleft()
+            self._size -= 1
+            if self._teardown_callback is not None:
+                await call(self._teardown_callback, instance, None)
+
+    async def _teardown(self, exc_value: BaseException | None) -> None:
+        instances = [instance for instance, _ in self._idle]
+        instances += [
+            borrow.value
+            for borrow in self._borrows.values()
+            if borrow.value is not _MISSING
+        ]
+        self._idle.clear()
+        self._size = 0
+        if self._teardown_callback is not None:
+            for instance in instances:
+                await call(self._teardown_callback, instance, exc_value)
+
+
+class _Borrow:
+    __slots__ = ("value", "generation", "exclusive", "deadline", "borrower")
+
+    def __init__(
+        self,
+        value: Any,
+        generation: int,
+        exclusive: bool,
+        deadline: float | None,
+        borrower: str | None,
+    ) -> None:
+        self.value = value
+        self.generation = generation
+        self.exclusive = exclusive
+        self.deadline = deadline
+        self.borrower = borrower
+
+
+class _BorrowRequest:
+    __slots__ = ("mode", "lease", "borrower", "event", "value")
+
+    def __init__(
+        self, mode: _BorrowMode, lease: float | None, borrower: str | None
+    ) -> None:
+        self.mode = mode
+        self.lease = lease
+        self.borrower = borrower
+        self.event = Event()
+        self.value: Value | None = None
+
+
+@dataclass(frozen=True)
+class SharedValueStatistics:
+    """
+    Statistics about the borrowers of a [SharedValue][fps.SharedValue].
+    """
+
+    borrowers: int
+    """The number of borrowers currently holding the value."""
+    max_borrowers: float
+    """The maximum number of borrowers that can hold the value at the same time."""
+    waiting: int
+    """The number of borrowers waiting in line for the value."""
+    waits: int
+    """The number of borrowers that had to wait for the value."""
+    total_wait_time: float
+    """The total time (in seconds) that borrowers waited for the value."""
+    max_wait_time: float
+    """The longest time (in seconds) that a borrower waited for the value."""
+
 
 class Context:
     """
@@ -223,15 +859,45 @@ class Context:
     children, but not its parent.
     """
 
-    def __init__(self) -> None:
-        self._context: dict[int, SharedValue] = {}
-        self._value_added = Event()
+    __slots__ = (
+        "_context",
+        "_waiters",
+        "_bases",
+        "_closed",
+        "_concurrent_teardown",
+        "_teardown_callbacks",
+        "_teardown_timings",
+        "_parent",
+        "_children",
+        "_token",
+        "_resolved",
+        "_resolved_generation",
+        "__weakref__",
+    )
+
+    # incremented every time a value is put in any context or a context is closed,
+    # which invalidates the shared values resolved by all contexts
+    _put_generation = 0
+
+    def __init__(self, concurrent_teardown: bool = False) -> None:
+        """
+        Args:
+            concurrent_teardown: Whether to call the teardown callbacks concurrently, instead
+                of one after the other.
+        """
+        self._context: dict[tuple[int, Hashable], SharedValue] = {}
+        self._waiters: dict[tuple[int, Hashable], set[Event]] = {}
+        self._bases: dict[tuple[int, Hashable], list[tuple[type, SharedValue]]] = {}
         self._closed = False
+        self._concurrent_teardown = concurrent_teardown
         self._teardown_callbacks: list[
-            Callable[..., Any] | Callable[..., Awaitable[Any]]
+            tuple[Callable[..., Any] | Callable[..., Awaitable[Any]], list[int]]
         ] = []
+        self._teardown_timings: list[tuple[Callable[..., Any], float]] = []
         self._parent: Context | None = None
         self._children: set[Context] = set()
+        self._resolved: dict[tuple[int, Hashable], SharedValue | None] = {}
+        self._resolved_generation = -1
 
     async def __aenter__(self) -> Context:
         try:
@@ -263,18 +929,39 @@ class Context:
         if self._closed:
             raise RuntimeError("Context is closed")
 
+    @property
+    def teardown_timings(self) -> list[tuple[Callable[..., Any], float]]:
+        """
+        Returns:
+            The teardown callbacks that were called when closing the context, with the time
+                (in seconds) each of them took, in the order they completed.
+        """
+        return self._teardown_timings
+
     def add_teardown_callback(
         self,
         teardown_callback: Callable[..., Any] | Callable[..., Awaitable[Any]],
+        after: Iterable[Callable[..., Any] | Callable[..., Awaitable[Any]]] = (),
     ) -> None:
         """
         Register a callback that will be called at context teardown. The callbacks
-        will be called in the inverse order than they were added.
+        will be called in the inverse order than they were added, unless the context
+        tears down concurrently, in which case they will be called concurrently.
 
         Args:
             teardown_callback: The callback to add.
+            after: The callbacks that must have completed before this one is called,
+                when tearing down concurrently. They must have already been added.
         """
-        self._teardown_callbacks.append(teardown_callback)
+        dependencies = []
+        for callback in after:
+            for idx, (_callback, _) in enumerate(self._teardown_callbacks):
+                if _callback == callback:
+                    dependencies.append(idx)
+                    break
+            else:
+                raise RuntimeError(f"Teardown callback not found: {callback}")
+        self._teardown_callbacks.append((teardown_callback, dependencies))
 
     def put(
         self,
@@ -285,6 +972,9 @@ class Context:
         | Callable[..., Awaitable[Any]]
         | None = None,
         shared_value: SharedValue[T] | None = None,
+        bases: bool = False,
+        key: Hashable = None,
+        lease: float | None = None,
     ) -> SharedValue[T]:
         """
         Put a value in the context so that it can be shared.
@@ -295,6 +985,15 @@ class Context:
                 provided, the value type will be used.
             max_borrowers: The number of times the shared value can be borrowed at the same time.
             teardown_callback: An optional callback to call when the context is closed.
+            bases: Whether to also register the value as the base classes of its type(s),
+                so that it can be borrowed as any of them. If several values are registered
+                as the same base class, borrowing them as this base class is ambiguous and
+                fails.
+            key: An optional key to register the value with, which allows to put several
+                values of the same type in the context. The value must then be borrowed
+                with the same key.
+            lease: The default time (in seconds) after which a borrow of the value is
+                reclaimed, if it was not dropped.
 
         Returns:
             The shared value.
@@ -308,18 +1007,229 @@ class Context:
                 value,
                 max_borrowers=max_borrowers,
                 teardown_callback=teardown_callback,
+                lease=lease,
             )
-        _types = _get_value_types(value, types)
-        for value_type in _types:
-            value_type_id = id(value_type)
-            if value_type_id in self._context:
-                raise RuntimeError(f'Value type "{value_type}" already exists')
-            self._context[value_type_id] = _shared_value
-            self._value_added.set()
-            self._value_added = Event()
+        self._put_shared_value(
+            _shared_value, _get_value_types(value, types), bases=bases, key=key
+        )
+        return _shared_value
+
+    def put_factory(
+        self,
+        factory: Callable[[], T] | Callable[[], Awaitable[T]],
+        types: Iterable | Any | None = None,
+        max_borrowers: float = float("inf"),
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+        shared_value: SharedValue[T] | None = None,
+        key: Hashable = None,
+        lease: float | None = None,
+    ) -> SharedValue[T]:
+        """
+        Put a factory in the context, so that the value it builds can be shared.
+        The factory is only called when the value is first borrowed, and concurrent
+        first borrowers share the same build.
+
+        Args:
+            factory: The (sync or async) callable that builds the value.
+            types: The type(s) to register the value as. If not provided, the factory must
+                be a type, which will be used.
+            max_borrowers: The number of times the shared value can be borrowed at the same time.
+            teardown_callback: An optional callback to call when the context is closed, if the
+                value was built. It is passed the value and the exception that caused the
+                teardown, if any.
+            key: An optional key to register the value with.
+            lease: The default time (in seconds) after which a borrow of the value is
+                reclaimed, if it was not dropped.
+
+        Returns:
+            The shared value.
+        """
+        self._check_closed()
+        if shared_value is not None:
+            _shared_value = shared_value
+        else:
+            _shared_value = _LazySharedValue(
+                factory,
+                max_borrowers=max_borrowers,
+                teardown_callback=teardown_callback,
+                lease=lease,
+            )
+        self._put_shared_value(
+            _shared_value, _get_factory_types(factory, types), key=key
+        )
         return _shared_value
 
-    async def get(self, value_type: type[T], timeout: float = float("inf")) -> Value[T]:
+    def put_pool(
+        self,
+        factory: Callable[[], T] | Callable[[], Awaitable[T]],
+        types: Iterable | Any | None = None,
+        min_size: int = 0,
+        max_size: float = float("inf"),
+        idle_timeout: float | None = None,
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+        shared_value: SharedValuePool[T] | None = None,
+        key: Hashable = None,
+        lease: float | None = None,
+    ) -> SharedValuePool[T]:
+        """
+        Put a pool of interchangeable values in the context so that they can be shared.
+        Getting a value of the pool's type from the context borrows an idle instance from
+        the pool, and dropping the value returns the instance to the pool.
+        See [SharedValuePool][fps.SharedValuePool].
+
+        Args:
+            factory: The (sync or async) callable that creates a new instance.
+            types: The type(s) to register the pool as. If not provided, the factory must
+                be a type, which will be used.
+            min_size: The minimum number of instances in the pool.
+            max_size: The maximum number of instances in the pool.
+            idle_timeout: The time (in seconds) after which an idle instance is torn down.
+            teardown_callback: An optional callback to call when an instance is torn down.
+            key: An optional key to register the pool with.
+            lease: The default time (in seconds) after which a borrowed instance is
+                returned to the pool, if it was not dropped.
+
+        Returns:
+            The shared value pool.
+        """
+        self._check_closed()
+        if shared_value is not None:
+            pool = shared_value
+        else:
+            pool = SharedValuePool(
+                factory,
+                min_size=min_size,
+                max_size=max_size,
+                idle_timeout=idle_timeout,
+                teardown_callback=teardown_callback,
+                lease=lease,
+            )
+        self._put_shared_value(pool, _get_factory_types(factory, types), key=key)
+        return pool
+
+    async def replace(
+        self,
+        old: Any,
+        new: Any,
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+    ) -> None:
+        """
+        Replace a value that was put in the context with a new one, which is shared
+        under the same type(s). New borrowers get the new value right away, while existing
+        borrowers keep the old value until they drop it. The old value is then torn down
+        with its teardown callback, and this returns.
+        See [SharedValue.replace][fps.SharedValue.replace].
+
+        Args:
+            old: The value that was put in the context.
+            new: The new value.
+            teardown_callback: An optional callback to call when the context is closed,
+                for the new value.
+
+        Raises:
+            RuntimeError: If the old value is not found in the context.
+        """
+        self._check_closed()
+        for shared_value in self._context.values():
+            if shared_value._value is old:
+                break
+        else:
+            raise RuntimeError("Value not found")
+        await shared_value.replace(new, teardown_callback)
+
+    def _put_shared_value(
+        self,
+        shared_value: SharedValue,
+        types: Iterable,
+        bases: bool = False,
+        key: Hashable = None,
+    ) -> None:
+        types = list(types)
+        for value_type in types:
+            index_key = (id(value_type), key)
+            if index_key in self._context:
+                if key is None:
+                    raise RuntimeError(f'Value type "{value_type}" already exists')
+                raise RuntimeError(
+                    f'Value type "{value_type}" with key "{key}" already exists'
+                )
+            self._context[index_key] = shared_value
+            Context._put_generation += 1
+            self._wake_waiters(index_key)
+        if bases:
+            # index the value by the base classes of its types, so that
+            # borrowing it as a base class is a single lookup
+            for value_type in types:
+                for base in getattr(value_type, "__mro__", ())[1:-1]:
+                    index_key = (id(base), key)
+                    registered = self._bases.setdefault(index_key, [])
+                    if all(
+                        _shared_value is not shared_value
+                        for _, _shared_value in registered
+                    ):
+                        registered.append((value_type, shared_value))
+                        self._wake_waiters(index_key)
+
+    def _remove_shared_value(self, shared_value: SharedValue) -> None:
+        for index_key, _shared_value in list(self._context.items()):
+            if _shared_value is shared_value:
+                del self._context[index_key]
+        for index_key, registered in list(self._bases.items()):
+            registered[:] = [
+                (value_type, _shared_value)
+                for value_type, _shared_value in registered
+                if _shared_value is not shared_value
+            ]
+            if not registered:
+                del self._bases[index_key]
+        Context._put_generation += 1
+
+    def _lookup(self, value_type: type, key: Hashable = None) -> SharedValue | None:
+        self._check_closed()
+        index_key = (id(value_type), key)
+        shared_value = self._context.get(index_key)
+        if shared_value is None and self._bases:
+            registered = self._bases.get(index_key)
+            if registered is not None:
+                if len(registered) > 1:
+                    subclasses = ", ".join(
+                        f'"{subclass}"' for subclass, _ in registered
+                    )
+                    raise RuntimeError(
+                        f'Value type "{value_type}" is ambiguous, it is a base class of: '
+                        f"{subclasses}"
+                    )
+                shared_value = registered[0][1]
+        return shared_value
+
+    def _add_waiter(self, index_key: tuple[int, Hashable], event: Event) -> None:
+        self._waiters.setdefault(index_key, set()).add(event)
+
+    def _remove_waiter(self, index_key: tuple[int, Hashable], event: Event) -> None:
+        waiters = self._waiters.get(index_key)
+        if waiters is not None:
+            waiters.discard(event)
+            if not waiters:
+                del self._waiters[index_key]
+
+    def _wake_waiters(self, index_key: tuple[int, Hashable]) -> None:
+        for event in self._waiters.pop(index_key, ()):
+            event.set()
+
+    async def get(
+        self,
+        value_type: type[T],
+        timeout: float = float("inf"),
+        key: Hashable = None,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+    ) -> Value[T]:
         """
         Get a value from the context, with the given type.
         The value will be returned if/when it is put in the context and when it accepts
@@ -328,6 +1238,11 @@ class Context:
         Args:
             value_type: The type of the value to get.
             timeout: The time to wait to get the value.
+            key: The key the value was put with, if any.
+            mode: Whether to borrow the value along with other borrowers ("shared"),
+                or as its only borrower ("exclusive").
+            lease: The time (in seconds) after which the borrow is reclaimed, if the value
+                was not dropped. If not provided, the default lease of the value is used.
 
         Returns:
             The borrowed `Value`.
@@ -335,67 +1250,148 @@ class Context:
         Raises:
             TimeoutError: If the value could not be borrowed in time.
         """
-        values = []
+        return await _get_from_contexts(
+            self._get_contexts(), value_type, timeout, key, mode, lease
+        )
 
-        async def get_in_context(context):
-            values.append(await context._get(value_type))
-            tg.cancel_scope.cancel()
+    async def get_many(
+        self, *value_types: type, timeout: float = float("inf")
+    ) -> tuple[Value, ...]:
+        """
+        Get values from the context, with the given types.
+        The values will be returned when they have all been put in the context and
+        when they accept to be borrowed. Waiting for the values is done concurrently.
 
-        with fail_after(timeout):
-            try:
-                async with create_task_group() as tg:
-                    context: Context | None = self
-                    while context is not None:
-                        tg.start_soon(get_in_context, context)
-                        context = context._parent
-            except ExceptionGroup as exc_group:
-                for exc in exc_group.exceptions:
-                    raise exc
-            return values[0]
-
-    def get_nowait(self, value_type: type[T]) -> Value[T]:
+        Args:
+            value_types: The types of the values to get.
+            timeout: The time to wait to get all the values.
+
+        Returns:
+            The borrowed `Value`s, in the order of the given types.
+
+        Raises:
+            TimeoutError: If the values could not be borrowed in time.
+        """
+        values = await _get_many_from_contexts(
+            self._get_contexts(), value_types, timeout
+        )
+        return tuple(values)
+
+    def _get_contexts(self) -> list[Context]:
+        contexts: list[Context] = []
+        context: Context | None = self
+        while context is not None:
+            contexts.append(context)
+            context = context._parent
+        return contexts
+
+    def get_nowait(
+        self,
+        value_type: type[T],
+        key: Hashable = None,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+    ) -> Value[T]:
         """
         Get a value from the context, with the given type.
         The value will be returned immediately if it is in the context.
 
         Args:
             value_type: The type of the value to get.
+            key: The key the value was put with, if any.
+            mode: Whether to borrow the value along with other borrowers ("shared"),
+                or as its only borrower ("exclusive").
+            lease: The time (in seconds) after which the borrow is reclaimed, if the value
+                was not dropped. If not provided, the default lease of the value is used.
 
         Returns:
             The borrowed `Value`.
 
         Raises:
-            RuntimeError: If the shared value is not found or cannot be borrowed.
+            RuntimeError: If the shared value is not found or cannot be borrowed, or if
+                the value type is ambiguous.
         """
-        context: Context | None = self
-        while context is not None:
+        shared_value = self._resolve(value_type, key)
+        if shared_value is None:
+            raise RuntimeError("Shared value not found or cannot be borrowed")
+        if shared_value is not _MISSING:
             try:
-                value = context._get_nowait(value_type)
+                return shared_value.get_nowait(mode, lease)
             except RuntimeError:
                 pass
-            else:
-                break
+        # the nearest shared value cannot be borrowed, try the ones further up
+        context: Context | None = self
+        while context is not None:
+            if not context._closed:
+                shared_value = context._lookup(value_type, key)
+                if shared_value is not None:
+                    try:
+                        return shared_value.get_nowait(mode, lease)
+                    except RuntimeError:
+                        pass
             context = context._parent
-        else:
-            raise RuntimeError("Shared value not found or cannot be borrowed")
-        return value
+        raise RuntimeError("Shared value not found or cannot be borrowed")
+
+    def _resolve(self, value_type: type, key: Hashable = None) -> SharedValue | None:
+        # Find the nearest shared value in the context and its ancestors, or None if
+        # there is none. The result is cached until a value is put in any context.
+        # If it cannot be resolved, _MISSING is returned.
+        if self._resolved_generation != Context._put_generation:
+            self._resolved.clear()
+            self._resolved_generation = Context._put_generation
+        index_key = (id(value_type), key)
+        shared_value = self._resolved.get(index_key, _MISSING)
+        if shared_value is _MISSING:
+            contexts = self._get_contexts()
+            try:
+                shared_value = _find_shared_value(contexts, value_type, key)
+            except RuntimeError:
+                if not any(context._closed for context in contexts):
+                    # the value type is ambiguous
+                    raise
+                # a context is closed, skip it
+                return _MISSING
+            self._resolved[index_key] = shared_value
+        return shared_value
+
+    def get_from_thread(
+        self,
+        value_type: type[T],
+        timeout: float = float("inf"),
+        key: Hashable = None,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+    ) -> Value[T]:
+        """
+        Get a value from the context, with the given type, from a worker thread
+        (see `anyio.to_thread.run_sync`). Borrowing is done in the event loop: if the value
+        can be borrowed right away, this only runs `get_nowait()` in the event loop,
+        otherwise this waits for `get()` to return. The value must be dropped with
+        [Value.drop_from_thread][fps.Value.drop_from_thread].
 
-    async def _get(self, value_type: type[T]) -> Value[T]:
-        self._check_closed()
-        value_type_id = id(value_type)
-        while True:
-            if value_type_id in self._context:
-                shared_value = self._context[value_type_id]
-                return await shared_value.get()
-            await self._value_added.wait()
+        Args:
+            value_type: The type of the value to get.
+            timeout: The time to wait to get the value.
+            key: The key the value was put with, if any.
+            mode: Whether to borrow the value along with other borrowers ("shared"),
+                or as its only borrower ("exclusive").
+            lease: The time (in seconds) after which the borrow is reclaimed, if the value
+                was not dropped. If not provided, the default lease of the value is used.
 
-    def _get_nowait(self, value_type: type[T]) -> Value[T]:
-        self._check_closed()
-        value_type_id = id(value_type)
-        if value_type_id in self._context:
-            shared_value = self._context[value_type_id]
-            return shared_value.get_nowait()
-        raise RuntimeError("Shared value not found")
+        Returns:
+            The borrowed `Value`.
+
+        Raises:
+            TimeoutError: If the value could not be borrowed in time.
+        """
+        try:
+            return from_thread.run_sync(
+                partial(self.get_nowait, value_type, key, mode, lease)
+            )
+        except RuntimeError:
+            return from_thread.run(
+                partial(self.get, value_type, timeout, key, mode, lease)
+            )
 
     async def aclose(
         self,
@@ -428,23 +1424,85 @@ class Context:
                             _exc_tb=_exc_tb,
                         )
                     )
-                for callback in self._teardown_callbacks[::-1]:
-                    await call(callback, _exc_value)
+                if self._concurrent_teardown:
+                    done = [Event() for _ in self._teardown_callbacks]
+                    for idx in range(len(self._teardown_callbacks)):
+                        tg.start_soon(self._teardown, idx, done, _exc_value)
+                else:
+                    for callback, _ in self._teardown_callbacks[::-1]:
+                        await self._call_teardown_callback(callback, _exc_value)
         self._closed = True
+        Context._put_generation += 1
+
+    async def _teardown(
+        self, idx: int, done: list[Event], exc_value: BaseException | None
+    ) -> None:
+        callback, dependencies = self._teardown_callbacks[idx]
+        for dependency in dependencies:
+            await done[dependency].wait()
+        await self._call_teardown_callback(callback, exc_value)
+        done[idx].set()
+
+    async def _call_teardown_callback(
+        self,
+        callback: Callable[..., Any] | Callable[..., Awaitable[Any]],
+        exc_value: BaseException | None,
+    ) -> None:
+        t0 = perf_counter()
+        await call(callback, exc_value)
+        self._teardown_timings.append((callback, perf_counter() - t0))
+
+
+_POSITIONAL = (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)
+# the parameter kinds of callables, keyed on the code of plain functions so that closures
+# and bound methods created on the fly share an entry, and weakly so that it doesn't keep
+# them alive
+_parameter_kinds: WeakKeyDictionary[Any, tuple[Any, ...]] = WeakKeyDictionary()
 
 
-@lru_cache(maxsize=1024)
 def count_parameters(func: Callable) -> int:
     """Count the number of parameters in a callable"""
-    return len(signature(func).parameters)
+    return len(_get_parameter_kinds(func))
+
+
+def _get_parameter_kinds(func: Callable) -> tuple[Any, ...]:
+    if isinstance(func, partial):
+        kinds = _get_parameter_kinds(func.func)
+        # the partial's positional arguments are bound to the leading positional parameters
+        positional_nb = 0
+        while positional_nb < len(kinds) and kinds[positional_nb] in _POSITIONAL:
+            positional_nb += 1
+        return kinds[min(len(func.args), positional_nb) :]
+    if isinstance(func, MethodType):
+        kinds = _get_parameter_kinds(func.__func__)
+        # the instance is bound to the first parameter
+        if kinds and kinds[0] in _POSITIONAL:
+            return kinds[1:]
+        return kinds
+    key: Any = func
+    if (
+        isinstance(func, FunctionType)
+        and not hasattr(func, "__wrapped__")
+        and not hasattr(func, "__signature__")
+    ):
+        key = func.__code__
+    try:
+        return _parameter_kinds[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # the callable cannot be weakly referenced
+        return tuple(param.kind for param in signature(func).parameters.values())
+    kinds = tuple(param.kind for param in signature(func).parameters.values())
+    _parameter_kinds[key] = kinds
+    return kinds
 
 
 async def call(
     callback: Callable[..., Any] | Callable[..., Awaitable[Any]],
-    exc_value: BaseException | None,
+    *params: Any,
 ) -> None:
     param_nb = count_parameters(callback)
-    params = (exc_value,)
     res = callback(*params[:param_nb])
     if isawaitable(res):
         await res
@@ -466,6 +1524,9 @@ def put(
     types: Iterable | Any | None = None,
     max_borrowers: float = float("inf"),
     teardown_callback: Callable[..., Any] | Callable[..., Awaitable[Any]] | None = None,
+    bases: bool = False,
+    key: Hashable = None,
+    lease: float | None = None,
 ) -> SharedValue[T]:
     """
     Put a value in the current context so that it can be shared.
@@ -476,6 +1537,10 @@ def put(
             provided, the value type will be used.
         max_borrowers: The number of times the shared value can be borrowed at the same time.
         teardown_callback: An optional callback to call when the context is closed.
+        bases: Whether to also register the value as the base classes of its type(s).
+        key: An optional key to register the value with.
+        lease: The default time (in seconds) after which a borrow of the value is
+            reclaimed, if it was not dropped.
 
     Returns:
         The shared value.
@@ -483,12 +1548,23 @@ def put(
     Raises:
         LookupError: If there is no current context.
     """
-    return current_context().put(value, types, max_borrowers, teardown_callback)
+    return current_context().put(
+        value,
+        types,
+        max_borrowers,
+        teardown_callback,
+        bases=bases,
+        key=key,
+        lease=lease,
+    )
 
 
 async def get(
     value_type: type[T],
     timeout: float = float("inf"),
+    key: Hashable = None,
+    mode: _BorrowMode = "shared",
+    lease: float | None = None,
 ) -> Value[T]:
     """
     Get a value from the current context, with the given type.
@@ -498,6 +1574,11 @@ async def get(
     Args:
         value_type: The type of the value to get.
         timeout: The time to wait to get the value.
+        key: The key the value was put with, if any.
+        mode: Whether to borrow the value along with other borrowers ("shared"),
+            or as its only borrower ("exclusive").
+        lease: The time (in seconds) after which the borrow is reclaimed, if the value
+            was not dropped. If not provided, the default lease of the value is used.
 
     Returns:
         The borrowed `Value`.
@@ -506,25 +1587,126 @@ async def get(
         TimeoutError: If the value could not be borrowed in time.
         LookupError: If there is no current context.
     """
-    return await current_context().get(value_type, timeout)
+    return await current_context().get(value_type, timeout, key, mode, lease)
 
 
-def get_nowait(value_type: type[T]) -> Value[T]:
+def get_nowait(
+    value_type: type[T],
+    key: Hashable = None,
+    mode: _BorrowMode = "shared",
+    lease: float | None = None,
+) -> Value[T]:
     """
     Get a value from the current context, with the given type.
     The value will be returned immediately if it is in the context.
 
     Args:
         value_type: The type of the value to get.
+        key: The key the value was put with, if any.
+        mode: Whether to borrow the value along with other borrowers ("shared"),
+            or as its only borrower ("exclusive").
+        lease: The time (in seconds) after which the borrow is reclaimed, if the value
+            was not dropped. If not provided, the default lease of the value is used.
 
     Returns:
         The borrowed `Value`.
 
     Raises:
         LookupError: If there is no current context.
-        RuntimeError: If the shared value is not found or cannot be borrowed.
+        RuntimeError: If the shared value is not found or cannot be borrowed, or if the
+            value type is ambiguous.
     """
-    return current_context().get_nowait(value_type)
+    return current_context().get_nowait(value_type, key, mode, lease)
+
+
+async def _get_from_contexts(
+    contexts: list[Context],
+    value_type: type[T],
+    timeout: float = float("inf"),
+    key: Hashable = None,
+    mode: _BorrowMode = "shared",
+    lease: float | None = None,
+    borrower: str | None = None,
+) -> Value[T]:
+    # Look for the value synchronously in the contexts, by order of priority.
+    # On a miss, the current task waits for the value type in all the contexts,
+    # so that no task is created.
+    if timeout != float("inf"):
+        with fail_after(timeout):
+            return await _get_from_contexts(
+                contexts, value_type, key=key, mode=mode, lease=lease, borrower=borrower
+            )
+
+    index_key = (id(value_type), key)
+    while True:
+        shared_value = _find_shared_value(contexts, value_type, key)
+        if shared_value is not None:
+            return await shared_value.get(mode=mode, lease=lease, _borrower=borrower)
+        event = Event()
+        for context in contexts:
+            context._add_waiter(index_key, event)
+        try:
+            await event.wait()
+        finally:
+            for context in contexts:
+                context._remove_waiter(index_key, event)
+
+
+async def _get_many_from_contexts(
+    contexts: list[Context],
+    value_types: tuple[type, ...],
+    timeout: float = float("inf"),
+    borrower: str | None = None,
+) -> list[Value]:
+    # Borrow the values that are available right away, and wait for the other ones
+    # concurrently. If not all values could be borrowed, the borrowed ones are dropped.
+    values: list[Value | None] = [None] * len(value_types)
+
+    async def get_value(idx: int, value_type: type) -> None:
+        values[idx] = await _get_from_contexts(contexts, value_type, borrower=borrower)
+
+    try:
+        missing = []
+        for idx, value_type in enumerate(value_types):
+            shared_value = _find_shared_value(contexts, value_type)
+            try:
+                if shared_value is None:
+                    raise RuntimeError("Shared value not found")
+                values[idx] = shared_value.get_nowait(_borrower=borrower)
+            except RuntimeError:
+                missing.append(idx)
+        if missing:
+            with fail_after(timeout):
+                try:
+                    async with create_task_group() as tg:
+                        for idx in missing:
+                            tg.start_soon(get_value, idx, value_types[idx])
+                except ExceptionGroup as exc_group:
+                    raise exc_group.exceptions[0]
+    except BaseException:
+        for value in values:
+            if value is not None:
+                value.drop()
+        raise
+    return values  # type: ignore[return-value]
+
+
+def _find_shared_value(
+    contexts: list[Context], value_type: type, key: Hashable = None
+) -> SharedValue | None:
+    for context in contexts:
+        shared_value = context._lookup(value_type, key)
+        if shared_value is not None:
+            return shared_value
+    return None
+
+
+def _get_factory_types(factory: Any, types: Iterable | Any | None = None) -> Iterable:
+    if types is None:
+        if not isinstance(factory, type):
+            raise RuntimeError("Types must be provided if the factory is not a type")
+        types = factory
+    return _get_value_types(None, types)
 
 
 def _get_value_types(value: Any, types: Iterable | Any | None = None) -> Iterable:
@@ -0,0 +1,436 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Hashable
+from typing import TYPE_CHECKING, Any, Iterable
+
+from ._context import _find_shared_value
+from ._importer import import_from_string
+from ._logging import get_logger
+
+if TYPE_CHECKING:
+    from ._module import Module  # pragma: no cover
+
+log = get_logger(__name__)
+
+
+def get_all_modules(root_module: Module) -> list[Module]:
+    """
+    Get a module and all its submodules recursively.
+
+    Args:
+        root_module: The module to start from.
+
+    Returns:
+        The modules, parents before their children.
+    """
+    modules = [root_module]
+    for module in root_module.modules.values():
+        modules.extend(get_all_modules(module))
+    return modules
+
+
+def get_provides(module: Module) -> set[type]:
+    return set(module.provides) | module._learned_provides
+
+
+def get_requires(module: Module) -> set[type]:
+    return set(module.requires) | module._learned_requires
+
+
+def provides_type(module: Module, value_type: type) -> bool:
+    return _provides(get_provides(module), value_type)
+
+
+def mark_dormant_modules(root_module: Module) -> None:
+    """
+    Mark the lazy modules and their submodules as dormant, until they are activated.
+
+    Args:
+        root_module: The root module.
+
+    Raises:
+        RuntimeError: A lazy module does not declare the types it provides.
+    """
+    for module in get_all_modules(root_module)[1:]:
+        assert module.parent is not None
+        if module.lazy and not get_provides(module):
+            raise RuntimeError(
+                f"Lazy module must declare the types it provides: {module.path}"
+            )
+        module._dormant = module.lazy or module.parent._dormant
+
+
+def get_lazy_producers(module: Module) -> list[Module]:
+    """
+    Get the dormant lazy modules that a module can borrow values from.
+
+    Args:
+        module: The module.
+
+    Returns:
+        The lazy modules that can be activated by the module.
+    """
+    return [
+        neighbor
+        for neighbor in _get_neighbors(module)
+        if neighbor.lazy and neighbor._dormant
+    ]
+
+
+def build_graph(root_module: Module) -> dict[Module, list[Module]]:
+    """
+    Build the dependency graph of a module and its submodules from the types they
+    provide and require. The producers of a type required by a module are the modules
+    it can borrow values from, i.e. its parent, its siblings and its children, which
+    provide that type (or a subclass of it). Dependencies which were learned from a
+    previous run are only hints: they are ignored if no module provides the required
+    type, or if they are part of a dependency cycle.
+
+    Args:
+        root_module: The root module.
+
+    Returns:
+        A `dict` of module to the modules it depends on.
+
+    Raises:
+        RuntimeError: A declared required type is not provided by any module.
+    """
+    provides = {module: get_provides(module) for module in get_all_modules(root_module)}
+    graph: dict[Module, list[Module]] = {}
+    learned_graph: dict[Module, list[Module]] = {}
+    for module, provided_types in provides.items():
+        producers: list[Module] = []
+        learned_producers: list[Module] = []
+        for value_type in get_requires(module):
+            if _provides(provided_types, value_type):
+                continue
+            declared = value_type in module.requires
+            _producers = [
+                producer
+                for producer in _get_neighbors(module)
+                if _provides(provides[producer], value_type)
+            ]
+            if not _producers:
+                if declared:
+                    raise RuntimeError(
+                        f"No module provides {value_type} required by module: "
+                        f"{module.path}"
+                    )
+                log.warning(
+                    "Ignoring learned dependency: no module provides the type",
+                    path=module.path,
+                    type=value_type,
+                )
+                continue
+            for producer in _producers:
+                if declared and _provides(producer.provides, value_type):
+                    if producer not in producers:
+                        producers.append(producer)
+                elif producer not in learned_producers:
+                    learned_producers.append(producer)
+        graph[module] = producers
+        learned_graph[module] = [
+            producer for producer in learned_producers if producer not in producers
+        ]
+    # a learned dependency which is part of a cycle is not a real one, e.g. if modules
+    # publish values before borrowing the values of each other
+    full_graph = {module: graph[module] + learned_graph[module] for module in graph}
+    for module, learned_producers in learned_graph.items():
+        for producer in learned_producers:
+            if _depends_on(full_graph, producer, module):
+                log.warning(
+                    "Ignoring learned dependency: it is part of a cycle",
+                    path=module.path,
+                    producer=producer.path,
+                )
+            else:
+                graph[module].append(producer)
+    return graph
+
+
+def get_waves(graph: dict[Module, list[Module]]) -> list[list[Module]]:
+    """
+    Sort a dependency graph topologically, in waves of modules that only depend on
+    modules of the previous waves.
+
+    Args:
+        graph: The dependency graph, as returned by `build_graph()`.
+
+    Returns:
+        The waves of modules.
+
+    Raises:
+        RuntimeError: The graph has a cycle.
+    """
+    waves: list[list[Module]] = []
+    done: set[Module] = set()
+    remaining = list(graph)
+    while remaining:
+        wave = [
+            module
+            for module in remaining
+            if all(producer in done for producer in graph[module])
+        ]
+        if not wave:
+            cycle = " -> ".join(module.path for module in _find_cycle(graph, remaining))
+            raise RuntimeError(f"Module dependency cycle: {cycle}")
+        waves.append(wave)
+        done.update(wave)
+        remaining = [module for module in remaining if module not in done]
+    return waves
+
+
+def get_critical_path(
+    graph: dict[Module, list[Module]], waves: list[list[Module]]
+) -> list[Module]:
+    """
+    Get the chain of dependent modules which took the longest to prepare and start.
+
+    Args:
+        graph: The dependency graph, as returned by `build_graph()`.
+        waves: The waves of modules, as returned by `get_waves()`.
+
+    Returns:
+        The modules of the critical path, producers before their consumers.
+    """
+    finish: dict[Module, float] = {}
+    previous: dict[Module, Module | None] = {}
+    for wave in waves:
+        for module in wave:
+            producer = max(graph[module], key=finish.__getitem__, default=None)
+            previous[module] = producer
+            finish[module] = sum(module._durations.values())
+            if producer is not None:
+                finish[module] += finish[producer]
+    last: Module | None = max(finish, key=finish.__getitem__)
+    path = []
+    while last is not None:
+        path.append(last)
+        last = previous[last]
+    return path[::-1]
+
+
+def find_deadlock(root_module: Module, phase: str) -> str | None:
+    """
+    Look for modules which are blocked in the current phase, waiting for values that
+    no module can publish anymore. A module can publish a value if it is still running
+    its phase without being blocked itself, if it was unblocked by such a module, or
+    if it declares that it provides the value's type. If a module declares the types it
+    provides, it cannot publish other types. Modules which are done with their phase
+    and wait in the background do not prevent the phase from completing, so if only
+    such modules are blocked, they may still get their values in a later phase or once
+    the application is running.
+
+    Args:
+        root_module: The root module.
+        phase: The current phase ("preparing" or "starting").
+
+    Returns:
+        A report of the deadlock, or `None` if there is no deadlock.
+    """
+    event_name = "prepared" if phase == "preparing" else "started"
+    pending: set[Module] = set()
+    blocked: dict[Module, list[tuple[type, Hashable]]] = {}
+    for module in get_all_modules(root_module):
+        # a module which is done with its phase may still publish values from its
+        # background tasks, until its phase returns
+        if module._dormant or (
+            getattr(module, event_name).is_set() and not module._in_phase
+        ):
+            continue
+        pending.add(module)
+        contexts = module._get_contexts()
+        waits = [
+            (value_type, key)
+            for value_type, key in module._waits
+            if _find_shared_value(contexts, value_type, key) is None
+        ]
+        if waits:
+            blocked[module] = waits
+    if not blocked:
+        return None
+
+    running = pending - set(blocked)
+    unblocked = True
+    while unblocked:
+        unblocked = False
+        for module, waits in list(blocked.items()):
+            if any(
+                producer not in blocked
+                and _can_publish(producer, value_type, producer in running)
+                for value_type, _ in waits
+                for producer in _get_neighbors(module)
+            ):
+                del blocked[module]
+                running.add(module)
+                unblocked = True
+    if all(getattr(module, event_name).is_set() for module in blocked):
+        return None
+
+    lines = [f"Modules are deadlocked while {phase}:"]
+    waiting_for: dict[Module, list[Module]] = {}
+    for module, waits in blocked.items():
+        waiting_for[module] = []
+        for value_type, key in waits:
+            producers = [
+                producer
+                for producer in _get_neighbors(module)
+                if producer in blocked and _can_publish(producer, value_type, True)
+            ]
+            waiting_for[module].extend(producers)
+            if key is None:
+                line = f"- {module.path} is waiting for {value_type}"
+            else:
+                line = f"- {module.path} is waiting for {value_type} with key {key!r}"
+            if producers:
+                paths = ", ".join(producer.path for producer in producers)
+                lines.append(f"{line}, which only blocked modules can publish: {paths}")
+            else:
+                lines.append(f"{line}, which no module can publish")
+    # modules which wait only for modules which could publish nothing cannot be in a cycle
+    remaining = list(waiting_for)
+    while True:
+        _remaining = [
+            module
+            for module in remaining
+            if any(producer in remaining for producer in waiting_for[module])
+        ]
+        if _remaining == remaining:
+            break
+        remaining = _remaining
+    if remaining:
+        cycle = " -> ".join(
+            module.path for module in _find_cycle(waiting_for, remaining)
+        )
+        lines.append(f"Cycle: {cycle}")
+    return "\n".join(lines)
+
+
+def load_dependencies(root_module: Module, path: str) -> None:
+    """
+    Load the types that modules provided and required in a previous run, if it was
+    recorded. A file which cannot be read, or types which cannot be imported anymore,
+    are ignored.
+
+    Args:
+        root_module: The root module.
+        path: The path to the file the run was recorded to.
+    """
+    import json
+
+    try:
+        with open(path) as f:
+            dependencies = json.load(f)
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError):
+        log.warning("Ignoring dependency file: it cannot be read", path=path)
+        return
+    for module in get_all_modules(root_module):
+        declarations = dependencies.get(module.path, {})
+        module._learned_provides = _load_types(declarations.get("provides", []))
+        module._learned_requires = _load_types(declarations.get("requires", []))
+
+
+def save_dependencies(root_module: Module, path: str) -> None:
+    """
+    Record the types that modules provided and required in the current run.
+
+    Args:
+        root_module: The root module.
+        path: The path to the file to record the run to.
+    """
+    import json
+
+    dependencies = {}
+    for module in get_all_modules(root_module):
+        provides = _dump_types(module._put_types)
+        requires = _dump_types(module._got_types)
+        if provides or requires:
+            dependencies[module.path] = {"provides": provides, "requires": requires}
+    # write the file atomically, so that it is not left half-written if the process is
+    # killed
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(dependencies, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        log.warning("Could not save dependency file", path=path)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _provides(provided_types: Iterable[type], value_type: type) -> bool:
+    return any(
+        issubclass(provided_type, value_type) for provided_type in provided_types
+    )
+
+
+def _can_publish(module: Module, value_type: type, running: bool) -> bool:
+    # a module which declares the types it provides may publish them in the background,
+    # otherwise it may publish anything while it is running its phase (the types learned
+    # from a previous run are not declarations, they may be outdated)
+    if module.provides:
+        return _provides(module.provides, value_type)
+    return running
+
+
+def _depends_on(
+    graph: dict[Module, list[Module]], module: Module, producer: Module
+) -> bool:
+    visited: set[Module] = set()
+    stack = [module]
+    while stack:
+        module = stack.pop()
+        if module is producer:
+            return True
+        if module not in visited:
+            visited.add(module)
+            stack.extend(graph[module])
+    return False
+
+
+def _get_neighbors(module: Module) -> list[Module]:
+    neighbors = list(module.modules.values())
+    parent = module.parent
+    if parent is not None:
+        neighbors.append(parent)
+        neighbors.extend(
+            sibling for sibling in parent.modules.values() if sibling is not module
+        )
+    return neighbors
+
+
+def _find_cycle(
+    graph: dict[Module, list[Module]], remaining: list[Module]
+) -> list[Module]:
+    # every remaining module depends on at least one other remaining module
+    _remaining = set(remaining)
+    path: list[Module] = []
+    module = remaining[0]
+    while module not in path:
+        path.append(module)
+        module = next(producer for producer in graph[module] if producer in _remaining)
+    return path[path.index(module) :] + [module]
+
+
+def _load_types(names: list[str]) -> set[type]:
+    types = set()
+    for name in names:
+        try:
+            types.add(import_from_string(name))
+        except Exception:
+            log.warning("Could not load recorded type", type=name)
+    return types
+
+
+def _dump_types(types: Iterable[Any]) -> list[str]:
+    return sorted(
+        f"{_type.__module__}:{_type.__qualname__}"
+        for _type in types
+        if "<locals>" not in _type.__qualname__
+    )
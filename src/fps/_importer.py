@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import importlib
-from typing import Any
+import os
+import sys
+from typing import Any, Iterable
 
-from importlib.metadata import entry_points
+from ._trace import span
+
+_entry_points: dict[str, str] | None = None
+_entry_points_cache: str | None = None
 
 
 class ImportFromStringError(Exception):
@@ -14,14 +19,19 @@ def import_from_string(import_str: Any) -> Any:
     if not isinstance(import_str, str):
         return import_str
 
+    with span("import", "fps", import_str):
+        return _import_from_string(import_str)
+
+
+def _import_from_string(import_str: str) -> Any:
     if ":" not in import_str:
         # this is an entry-point in the "fps.modules" group
-        for ep in entry_points(group="fps.modules"):
-            if ep.name == import_str:
-                return ep.load()
-        raise RuntimeError(
-            f'Module could not be found in entry-point group "fps.modules": {import_str}'
-        )
+        ep_str = get_entry_points().get(import_str)
+        if ep_str is None:
+            raise RuntimeError(
+                f'Module could not be found in entry-point group "fps.modules": {import_str}'
+            )
+        import_str = ep_str
 
     module_str, _, attrs_str = import_str.partition(":")
     try:
@@ -43,3 +53,161 @@ def import_from_string(import_str: Any) -> Any:
         )
 
     return instance
+
+
+def prefetch_imports(
+    import_strs: Iterable[Any], max_workers: int | None = None
+) -> None:
+    """
+    Import the Python modules that the given strings point to concurrently, in a thread
+    pool, so that importing them again with `import_from_string` is only a lookup.
+    The modules of a top-level package are imported one after the other in the same
+    thread, and independent packages in parallel. Import errors are ignored: they are
+    raised when importing again.
+
+    Args:
+        import_strs: The strings pointing to objects (or entry-points in the
+            "fps.modules" group). Objects which are not strings are skipped.
+        max_workers: The maximum number of threads to import in.
+    """
+    packages: dict[str, list[str]] = {}
+    for import_str in import_strs:
+        if not isinstance(import_str, str):
+            continue
+        if ":" not in import_str:
+            ep_str = get_entry_points().get(import_str)
+            if ep_str is None:
+                continue
+            import_str = ep_str
+        module_str = import_str.partition(":")[0].strip()
+        if module_str in sys.modules:
+            continue
+        module_strs = packages.setdefault(module_str.partition(".")[0], [])
+        if module_str not in module_strs:
+            module_strs.append(module_str)
+    if len(packages) < 2:
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        for module_strs in packages.values():
+            executor.submit(_import_modules, module_strs)
+
+
+def _import_modules(module_strs: list[str]) -> None:
+    from threading import current_thread
+
+    track = current_thread().name
+    for module_str in module_strs:
+        with span("import", track, module_str):
+            try:
+                importlib.import_module(module_str)
+            except Exception:
+                pass
+
+
+def get_entry_points() -> dict[str, str]:
+    """
+    Get the entry-points in the "fps.modules" group. They are looked up in the installed
+    distributions only once per process (see `invalidate_entry_points`), or read from the
+    on-disk cache if it is enabled and still valid.
+
+    Returns:
+        The entry-points, as a `dict` of entry-point name to the string pointing to the
+            object, like `"package.module:Object"`.
+    """
+    global _entry_points
+    if _entry_points is None:
+        with span("entry-points", "fps"):
+            _entry_points = _load_entry_points()
+    return _entry_points
+
+
+def invalidate_entry_points() -> None:
+    """
+    Invalidate the index of the entry-points in the "fps.modules" group, so that they are
+    looked up again the next time they are needed, e.g. after a distribution has been
+    installed. The on-disk cache, if enabled, is removed.
+    """
+    global _entry_points
+    _entry_points = None
+    if _entry_points_cache is not None:
+        try:
+            os.remove(_entry_points_cache)
+        except FileNotFoundError:
+            pass
+
+
+def set_entry_points_cache(path: str | None) -> None:
+    """
+    Enable or disable the on-disk cache of the entry-points in the "fps.modules" group.
+    The cache is keyed on the modification times of the installed distributions' metadata,
+    and is only valid as long as no distribution has been installed, upgraded or removed.
+
+    Args:
+        path: The path to the cache file, or `None` to disable the cache.
+    """
+    global _entry_points, _entry_points_cache
+    _entry_points = None
+    _entry_points_cache = path
+
+
+def _load_entry_points() -> dict[str, str]:
+    if _entry_points_cache is None:
+        return _scan_entry_points()
+
+    import json
+
+    key = _get_metadata_key()
+    try:
+        with open(_entry_points_cache) as f:
+            cache = json.load(f)
+        if cache["key"] == key:
+            return cache["entry_points"]
+    except (OSError, ValueError, KeyError):
+        pass
+    eps = _scan_entry_points()
+    # write the cache atomically, so that concurrent processes don't read it half-written
+    tmp_path = f"{_entry_points_cache}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "entry_points": eps}, f)
+        os.replace(tmp_path, _entry_points_cache)
+    except OSError:
+        # the cache cannot be written, the entry-points will be looked up again
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return eps
+
+
+def _scan_entry_points() -> dict[str, str]:
+    from importlib.metadata import entry_points
+
+    eps: dict[str, str] = {}
+    for ep in entry_points(group="fps.modules"):
+        # entry-points which do not point to an object in a module cannot be module types,
+        # and the first entry-point with a given name takes precedence
+        if ep.attr and ep.name not in eps:
+            eps[ep.name] = f"{ep.module}:{ep.attr}"
+    return eps
+
+
+def _get_metadata_key() -> str:
+    # the directories where distributions are installed, and their metadata directories,
+    # change when a distribution is installed, upgraded or removed
+    import hashlib
+
+    key = hashlib.sha256()
+    for path in sys.path:
+        try:
+            key.update(f"{path}:{os.stat(path or '.').st_mtime_ns}".encode())
+            with os.scandir(path or ".") as entries:
+                for entry in entries:
+                    if entry.name.endswith((".dist-info", ".egg-info")):
+                        key.update(f"{entry.name}:{entry.stat().st_mtime_ns}".encode())
+        except OSError:
+            pass
+    return key.hexdigest()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import Any
+
+_loggers: dict[str | None, Any] = {}
+_debug_enabled: bool | None = None
+
+
+class _Logger:
+    # imports structlog and sets up logging the first time it logs,
+    # instead of when FPS is imported
+    __slots__ = ("_name",)
+
+    def __init__(self, name: str | None) -> None:
+        self._name = name
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(_get_logger(self._name), name)
+
+
+def get_logger(name: str | None = None) -> Any:
+    """
+    Args:
+        name: The name of the logger, usually the calling module's `__name__`.
+
+    Returns:
+        A structlog logger which only imports structlog when it is first used.
+    """
+    return _Logger(name)
+
+
+def configure_logging(log_level: int | str = "INFO") -> None:
+    """
+    Log through the standard library's `logging` at the given level. This is done at
+    the "INFO" level when FPS first logs, unless structlog has already been configured
+    (e.g. by the application).
+
+    Args:
+        log_level: The logging level, as a number or a name (e.g. `"DEBUG"`).
+    """
+    global _debug_enabled
+    import logging
+
+    import structlog
+
+    level = log_level
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    structlog.stdlib.recreate_defaults(log_level=level)
+    _debug_enabled = None
+
+
+def is_debug_enabled() -> bool:
+    """
+    Check whether debug logs are emitted, so that building them can be skipped if not.
+    This is computed once, and again after `configure_logging()` is called.
+
+    Returns:
+        Whether debug logs are emitted.
+    """
+    global _debug_enabled
+    if _debug_enabled is None:
+        import logging
+
+        logger = _get_logger("fps").bind()
+        # loggers which cannot tell are assumed to emit debug logs (looking up the method
+        # on the class, since e.g. structlog's generic bound logger logs any method call)
+        _debug_enabled = not hasattr(
+            type(logger), "is_enabled_for"
+        ) or logger.is_enabled_for(logging.DEBUG)
+    return _debug_enabled
+
+
+def _get_logger(name: str | None) -> Any:
+    logger = _loggers.get(name)
+    if logger is None:
+        import structlog
+
+        if not structlog.is_configured():
+            configure_logging()
+        logger = _loggers[name] = structlog.get_logger(name)
+    return logger
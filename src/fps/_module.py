@@ -1,27 +1,49 @@
 from __future__ import annotations
 
-import logging
 import sys
 
-from collections.abc import Callable, Awaitable
+from collections.abc import Callable, Awaitable, Hashable, Iterator
 from contextlib import AsyncExitStack
+from functools import partial
 from inspect import isawaitable, signature, _empty
-from time import time
-from typing import TypeVar, Any, Iterable
+from time import perf_counter, time
+from typing import TypeVar, Any, Iterable, Literal
 
 import anyio
-import structlog
-from anyio import Event, create_task_group, fail_after, move_on_after
-
-from ._context import Context, SharedValue, Value, _get_value_types
-from ._importer import import_from_string
+from anyio import Event, create_task_group, from_thread, move_on_after, sleep
+
+from ._context import (
+    Context,
+    SharedValue,
+    Value,
+    _BorrowMode,
+    _get_factory_types,
+    _get_from_contexts,
+    _get_many_from_contexts,
+    _find_shared_value,
+    _get_value_types,
+)
+from ._graph import (
+    build_graph,
+    find_deadlock,
+    get_all_modules,
+    get_critical_path,
+    get_lazy_producers,
+    get_waves,
+    load_dependencies,
+    mark_dormant_modules,
+    provides_type,
+    save_dependencies,
+)
+from ._importer import import_from_string, prefetch_imports
+from ._logging import get_logger, is_debug_enabled
+from ._trace import application_running, end_span, span
 
 
 if sys.version_info < (3, 11):
     from exceptiongroup import BaseExceptionGroup, ExceptionGroup  # pragma: no cover
 
-log = structlog.get_logger()
-structlog.stdlib.recreate_defaults(log_level=logging.INFO)
+log = get_logger(__name__)
 
 T_Value = TypeVar("T_Value")
 
@@ -45,8 +67,31 @@ class Module:
     - [`prepare`][fps.Module.prepare]: called before the "start" phase.
     - [`start`][fps.Module.start]: called before running the application.
     - [`stop`][fps.Module.stop]: called when shutting down the application.
+
+    Modules can declare the types of the values they publish (`provides`) and borrow
+    (`requires`). The "prepare" and "start" phases of a module then begin after those of
+    the modules it depends on have completed, and dependency cycles are detected before
+    starting.
+
+    A module which declares the types it provides can be made `lazy`: it is then not
+    prepared and started with the other modules, but only when one of these types is
+    first borrowed, along with its submodules.
+
+    A module can be restarted when its "start" phase fails (including its background
+    tasks), instead of bringing the application down, by setting `restart` to
+    `"on-failure"`. Its submodules are then stopped and restarted with it, and the values
+    they published are withdrawn until they are published again. Restarts are delayed by
+    `restart_backoff` seconds, doubled after each restart, and the application fails if
+    the module fails more than `max_restarts` times within `restart_window` seconds.
     """
 
+    provides: Iterable[type] = ()
+    requires: Iterable[type] = ()
+    lazy: bool = False
+    restart: Literal["never", "on-failure"] = "never"
+    restart_backoff: float = 0.1
+    max_restarts: int = 3
+    restart_window: float = 60
     _exit: Event
     _exceptions: list[Exception]
 
@@ -57,6 +102,9 @@ class Module:
         start_timeout: float = 1,
         stop_timeout: float = 1,
         global_start_timeout: float | None = None,
+        concurrent_teardown: bool = False,
+        dependency_file: str | None = None,
+        detect_deadlocks: bool = True,
     ):
         """
         Args:
@@ -66,6 +114,15 @@ class Module:
             stop_timeout: The time to wait (in seconds) for the "stop" phase to complete.
             global_start_timeout: The time to wait (in seconds) for the "prepare" and "start"
                 phases to complete.
+            concurrent_teardown: Whether to call the teardown callbacks concurrently when
+                stopping, instead of one after the other. Context managers are always
+                exited one after the other, in the reverse order they were entered.
+            dependency_file: The path to a file where the types that modules provide and
+                require are recorded when the application has started, and loaded from
+                when starting again, in addition to the declared ones.
+            detect_deadlocks: Whether to fail right away when modules are blocked while
+                preparing or starting, waiting for values that no module can publish
+                anymore, instead of waiting for the phase to time out.
         """
         self._initialized = False
         self._prepare_timeout = prepare_timeout
@@ -73,7 +130,8 @@ class Module:
         self._stop_timeout = stop_timeout
         self._global_start_timeout = global_start_timeout
         self._parent: Module | None = None
-        self._context = Context()
+        self._concurrent_teardown = concurrent_teardown
+        self._context = Context(concurrent_teardown=concurrent_teardown)
         self._prepared = Event()
         self._started = Event()
         self._stopped = Event()
@@ -87,6 +145,23 @@ class Module:
         self._context_manager_exits: list[Callable] = []
         self._config: dict[str, Any] = {}
         self.config: Any = None
+        self._dependency_file = dependency_file
+        self._learned_provides: set[type] = set()
+        self._learned_requires: set[type] = set()
+        self._put_types: set[type] = set()
+        self._got_types: set[type] = set()
+        self._producers: list[Module] = []
+        self._durations: dict[str, float] = {}
+        self._phase_t0 = 0.0
+        self._detect_deadlocks = detect_deadlocks
+        self._waits: list[tuple[type, Hashable]] = []
+        self._in_phase = False
+        self._starting_up = False
+        self._running: set[Module] = set()
+        self._blocked: set[Module] = set()
+        self._dormant = False
+        self._lazy_producers: list[Module] = []
+        self._restart_times: list[float] = []
 
     @property
     def parent(self) -> Module | None:
@@ -226,6 +301,36 @@ class Module:
         for value in self._published_values.values():
             await value.freed()
 
+    async def replace(
+        self,
+        old: Any,
+        new: Any,
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+    ) -> None:
+        """
+        Replace a published value with a new one, which is published under the same type(s).
+        New borrowers get the new value right away, while existing borrowers keep the old
+        value until they drop it. The old value is then torn down with its teardown callback,
+        and this returns.
+
+        Args:
+            old: The published value.
+            new: The new value.
+            teardown_callback: A callback to call when the new value is torn down.
+
+        Raises:
+            RuntimeError: If the old value was not published by the module.
+        """
+        shared_value = self._published_values.pop(id(old), None)
+        if shared_value is None:
+            raise RuntimeError("Value not found")
+        self._published_values[id(new)] = shared_value
+        log.debug("Module replacing value", path=self.path)
+        await shared_value.replace(new, teardown_callback)
+        log.debug("Module replaced value", path=self.path)
+
     def drop_all(self) -> None:
         """
         Drop all borrowed values.
@@ -243,18 +348,31 @@ class Module:
         value_id = id(value)
         self._acquired_values[value_id].drop()
 
+    def drop_from_thread(self, value: Any) -> None:
+        """
+        Drop a borrowed value from a worker thread (see `anyio.to_thread.run_sync`).
+
+        Args:
+            value: The value to drop.
+        """
+        from_thread.run_sync(self.drop, value)
+
     def add_teardown_callback(
         self,
         teardown_callback: Callable[..., Any] | Callable[..., Awaitable[Any]],
+        after: Iterable[Callable[..., Any] | Callable[..., Awaitable[Any]]] = (),
     ) -> None:
         """
         Register a callback that will be called when stopping the module. The callbacks
-        will be called in the inverse order than they were added.
+        will be called in the inverse order than they were added, unless the module
+        tears down concurrently, in which case they will be called concurrently.
 
         Args:
             teardown_callback: The callback to add.
+            after: The callbacks that must have completed before this one is called,
+                when tearing down concurrently. They must have already been added.
         """
-        self._context.add_teardown_callback(teardown_callback)
+        self._context.add_teardown_callback(teardown_callback, after)
 
     def put(
         self,
@@ -264,6 +382,9 @@ class Module:
         teardown_callback: Callable[..., Any]
         | Callable[..., Awaitable[Any]]
         | None = None,
+        bases: bool = False,
+        key: Hashable = None,
+        lease: float | None = None,
     ) -> None:
         """
         Publish a value in the current module context and its parent's (if any).
@@ -274,6 +395,13 @@ class Module:
                 from the value.
             max_borrowers: The maximum number of simultaneous borrowers of the published value.
             teardown_callback: A callback to call when the value is torn down.
+            bases: Whether to also publish the value as the base classes of its type(s),
+                so that it can be borrowed as any of them.
+            key: An optional key to publish the value with, which allows to publish
+                several values of the same type. The value must then be borrowed with
+                the same key.
+            lease: The default time (in seconds) after which a borrow of the value is
+                reclaimed, if it was not dropped.
         """
         value_id = id(value)
         shared_value = self._context.put(
@@ -281,6 +409,9 @@ class Module:
             types,
             max_borrowers=max_borrowers,
             teardown_callback=teardown_callback,
+            bases=bases,
+            key=key,
+            lease=lease,
         )
         self._published_values[value_id] = shared_value
         if self.parent is not None:
@@ -290,12 +421,124 @@ class Module:
                 max_borrowers=max_borrowers,
                 teardown_callback=teardown_callback,
                 shared_value=shared_value,
+                bases=bases,
+                key=key,
+            )
+        _types = _get_value_types(value, types)
+        self._record_types(self._put_types, _types)
+        if is_debug_enabled():
+            log.debug("Module added value", path=self.path, types=list(_types), key=key)
+
+    def put_factory(
+        self,
+        factory: Callable[[], T_Value] | Callable[[], Awaitable[T_Value]],
+        types: Iterable | Any | None = None,
+        max_borrowers: float = float("inf"),
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+        key: Hashable = None,
+        lease: float | None = None,
+    ) -> None:
+        """
+        Publish a factory in the current module context and its parent's (if any).
+        The value is built by the factory when it is first borrowed, so that it costs
+        nothing if it is never borrowed.
+
+        Args:
+            factory: The (sync or async) callable that builds the value.
+            types: The type(s) to publish the value as. If not provided, the factory must
+                be a type, which will be used.
+            max_borrowers: The maximum number of simultaneous borrowers of the published value.
+            teardown_callback: A callback to call when the value is torn down, if it was built.
+                It is passed the value and the exception that caused the teardown, if any.
+            key: An optional key to publish the value with.
+            lease: The default time (in seconds) after which a borrow of the value is
+                reclaimed, if it was not dropped.
+        """
+        factory_id = id(factory)
+        shared_value = self._context.put_factory(
+            factory,
+            types,
+            max_borrowers=max_borrowers,
+            teardown_callback=teardown_callback,
+            key=key,
+            lease=lease,
+        )
+        self._published_values[factory_id] = shared_value
+        if self.parent is not None:
+            self.parent._context.put_factory(
+                factory, types, shared_value=shared_value, key=key
+            )
+        _types = _get_factory_types(factory, types)
+        self._record_types(self._put_types, _types)
+        if is_debug_enabled():
+            log.debug(
+                "Module added value factory",
+                path=self.path,
+                types=list(_types),
+                key=key,
+            )
+
+    def put_pool(
+        self,
+        factory: Callable[[], T_Value] | Callable[[], Awaitable[T_Value]],
+        types: Iterable | Any | None = None,
+        min_size: int = 0,
+        max_size: float = float("inf"),
+        idle_timeout: float | None = None,
+        teardown_callback: Callable[..., Any]
+        | Callable[..., Awaitable[Any]]
+        | None = None,
+        key: Hashable = None,
+        lease: float | None = None,
+    ) -> None:
+        """
+        Publish a pool of interchangeable values in the current module context and its
+        parent's (if any). Borrowing a value of the pool's type returns an idle instance,
+        and dropping it returns the instance to the pool.
+        See [SharedValuePool][fps.SharedValuePool].
+
+        Args:
+            factory: The (sync or async) callable that creates a new instance.
+            types: The type(s) to publish the pool as. If not provided, the factory must
+                be a type, which will be used.
+            min_size: The minimum number of instances in the pool.
+            max_size: The maximum number of instances in the pool.
+            idle_timeout: The time (in seconds) after which an idle instance is torn down.
+            teardown_callback: A callback to call when an instance is torn down.
+            key: An optional key to publish the pool with.
+            lease: The default time (in seconds) after which a borrowed instance is
+                returned to the pool, if it was not dropped.
+        """
+        factory_id = id(factory)
+        pool = self._context.put_pool(
+            factory,
+            types,
+            min_size=min_size,
+            max_size=max_size,
+            idle_timeout=idle_timeout,
+            teardown_callback=teardown_callback,
+            key=key,
+            lease=lease,
+        )
+        self._published_values[factory_id] = pool
+        if self.parent is not None:
+            self.parent._context.put_pool(factory, types, shared_value=pool, key=key)
+        _types = _get_factory_types(factory, types)
+        self._record_types(self._put_types, _types)
+        if is_debug_enabled():
+            log.debug(
+                "Module added value pool", path=self.path, types=list(_types), key=key
             )
-        _types = list(_get_value_types(value, types))
-        log.debug("Module added value", path=self.path, types=_types)
 
     async def get(
-        self, value_type: type[T_Value], timeout: float = float("inf")
+        self,
+        value_type: type[T_Value],
+        timeout: float = float("inf"),
+        key: Hashable = None,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
     ) -> T_Value:
         """
         Borrow a value from the current module's context or its parent's (if any).
@@ -303,42 +546,298 @@ class Module:
         Args:
             value_type: The type of the value to borrow.
             timeout: The time to wait for the value to be published.
+            key: The key the value was published with, if any.
+            mode: Whether to borrow the value along with other borrowers ("shared"),
+                or as its only borrower ("exclusive").
+            lease: The time (in seconds) after which the borrow is reclaimed, if the value
+                was not dropped. If not provided, the default lease of the value is used.
 
         Returns:
             The borrowed value.
         """
-        log.debug("Module getting value", path=self.path, value_type=value_type)
-
-        values = []
-
-        async def get_in_context(context):
-            values.append(await context.get(value_type))
-            tg.cancel_scope.cancel()
+        debug = is_debug_enabled()
+        if debug:
+            log.debug(
+                "Module getting value", path=self.path, value_type=value_type, key=key
+            )
 
+        if self._lazy_producers:
+            self._activate_producers(value_type)
+        value = None
+        wait = (value_type, key)
+        contexts = self._get_contexts()
+        blocking = (
+            timeout == float("inf")
+            and self._tracks_waits()
+            and not _is_published(contexts, value_type, key)
+        )
+        if blocking:
+            self._waits.append(wait)
+            self._update_running()
+            self._check_deadlock()
         try:
-            with fail_after(timeout):
-                async with create_task_group() as tg:
-                    tg.start_soon(get_in_context, self._context)
-                    if self.parent is not None:
-                        tg.start_soon(get_in_context, self.parent._context)
+            with span("get", self.path, value_type):
+                value = await _get_from_contexts(
+                    contexts,
+                    value_type,
+                    timeout,
+                    key,
+                    mode,
+                    lease,
+                    borrower=self.path,
+                )
         finally:
-            if not values:
+            if blocking:
+                self._waits.remove(wait)
+                self._update_running()
+            if value is None:
                 log.critical(
                     "Module could not get value", path=self.path, value_type=value_type
                 )
-        value = values[0]
         value_id = id(value.unwrap())
         self._acquired_values[value_id] = value
-        log.debug("Module got value", path=self.path, value_type=value_type)
+        self._record_types(self._got_types, [value_type])
+        if debug:
+            log.debug(
+                "Module got value", path=self.path, value_type=value_type, key=key
+            )
         return value.unwrap()
 
+    def get_from_thread(
+        self,
+        value_type: type[T_Value],
+        timeout: float = float("inf"),
+        key: Hashable = None,
+        mode: _BorrowMode = "shared",
+        lease: float | None = None,
+    ) -> T_Value:
+        """
+        Borrow a value from the current module's context or its parent's (if any),
+        from a worker thread (see `anyio.to_thread.run_sync`). Borrowing is done in the
+        event loop: if the value can be borrowed right away, this only borrows it
+        synchronously in the event loop, otherwise this waits for `get()` to return.
+        The value must be dropped with `drop_from_thread()`.
+
+        Args:
+            value_type: The type of the value to borrow.
+            timeout: The time to wait for the value to be published.
+            key: The key the value was published with, if any.
+            mode: Whether to borrow the value along with other borrowers ("shared"),
+                or as its only borrower ("exclusive").
+            lease: The time (in seconds) after which the borrow is reclaimed, if the value
+                was not dropped. If not provided, the default lease of the value is used.
+
+        Returns:
+            The borrowed value.
+        """
+        try:
+            return from_thread.run_sync(
+                partial(self._get_nowait, value_type, key, mode, lease)
+            )
+        except RuntimeError:
+            return from_thread.run(
+                partial(self.get, value_type, timeout, key, mode, lease)
+            )
+
+    def _get_nowait(
+        self,
+        value_type: type[T_Value],
+        key: Hashable,
+        mode: _BorrowMode,
+        lease: float | None,
+    ) -> T_Value:
+        shared_value = _find_shared_value(self._get_contexts(), value_type, key)
+        if shared_value is None:
+            raise RuntimeError("Shared value not found")
+        value = shared_value.get_nowait(mode, lease, _borrower=self.path)
+        self._acquired_values[id(value.unwrap())] = value
+        self._record_types(self._got_types, [value_type])
+        if is_debug_enabled():
+            log.debug(
+                "Module got value", path=self.path, value_type=value_type, key=key
+            )
+        return value.unwrap()
+
+    async def get_many(
+        self, *value_types: type, timeout: float = float("inf")
+    ) -> tuple[Any, ...]:
+        """
+        Borrow values from the current module's context or its parent's (if any).
+        Waiting for the values is done concurrently, so this takes as long as the last
+        value to be published.
+
+        Args:
+            value_types: The types of the values to borrow.
+            timeout: The time to wait for all the values to be published.
+
+        Returns:
+            The borrowed values, in the order of the given types.
+        """
+        debug = is_debug_enabled()
+        if debug:
+            log.debug("Module getting values", path=self.path, value_types=value_types)
+        if self._lazy_producers:
+            for value_type in value_types:
+                self._activate_producers(value_type)
+        values = None
+        contexts = self._get_contexts()
+        waits = []
+        if timeout == float("inf") and self._tracks_waits():
+            waits = [
+                (value_type, None)
+                for value_type in value_types
+                if not _is_published(contexts, value_type)
+            ]
+        blocking = bool(waits)
+        if blocking:
+            self._waits.extend(waits)
+            self._update_running()
+            self._check_deadlock()
+        try:
+            with span("get_many", self.path, value_types):
+                values = await _get_many_from_contexts(
+                    contexts, value_types, timeout, borrower=self.path
+                )
+        finally:
+            if blocking:
+                for wait in waits:
+                    self._waits.remove(wait)
+                self._update_running()
+            if values is None:
+                log.critical(
+                    "Module could not get values",
+                    path=self.path,
+                    value_types=value_types,
+                )
+        for value in values:
+            self._acquired_values[id(value.unwrap())] = value
+        self._record_types(self._got_types, value_types)
+        if debug:
+            log.debug("Module got values", path=self.path, value_types=value_types)
+        return tuple(value.unwrap() for value in values)
+
+    def _record_types(self, recorded_types: set[type], types: Iterable) -> None:
+        recorded_types.update(_type for _type in types if isinstance(_type, type))
+
+    def _get_root_module(self) -> Module:
+        root_module = self
+        while root_module.parent is not None:
+            root_module = root_module.parent
+        return root_module
+
+    def _activate_producers(self, value_type: type) -> None:
+        for producer in self._lazy_producers:
+            if producer._dormant and provides_type(producer, value_type):
+                producer._activate()
+
+    def _activate(self) -> None:
+        root_module = self._get_root_module()
+        if not self._dormant or root_module._phase == "stopping":
+            return
+        log.debug("Activating module", path=self.path)
+        self._wake()
+        root_module._task_group.start_soon(
+            self._prepare_and_start, name=f"{self.path} _prepare_and_start"
+        )
+
+    def _wake(self) -> None:
+        self._dormant = False
+        for module in self._modules.values():
+            if not module.lazy:
+                module._wake()
+
+    async def _prepare_and_start(self) -> None:
+        root_module = self._get_root_module()
+        self._exceptions = root_module._exceptions
+        self._phase = "preparing"
+        with move_on_after(self._prepare_timeout) as scope:
+            root_module._task_group.start_soon(
+                self._prepare, name=f"{self.path} _prepare"
+            )
+            await self._wait_or_exit(self._all_prepared)
+        if scope.cancelled_caught:
+            self._get_all_prepare_timeout()
+            self._exit.set()
+        if self._exit.is_set():
+            return
+        self._phase = "starting"
+        with move_on_after(self._start_timeout) as scope:
+            root_module._task_group.start_soon(self._start, name=f"{self.path} _start")
+            await self._wait_or_exit(self._all_started)
+        if scope.cancelled_caught:
+            self._get_all_start_timeout()
+            self._exit.set()
+        log.debug("Module activated", path=self.path)
+
+    def _tracks_waits(self) -> bool:
+        # waits are only tracked to detect deadlocks while the application is starting
+        root_module = self._get_root_module()
+        return root_module._detect_deadlocks and root_module._starting_up
+
+    def _update_running(self) -> None:
+        # keep track of the modules which are running their phase without being blocked,
+        # as there cannot be a deadlock as long as there is one
+        root_module = self._get_root_module()
+        event = self.prepared if self._phase == "preparing" else self.started
+        if self._in_phase and not event.is_set() and not self._waits:
+            root_module._running.add(self)
+        else:
+            root_module._running.discard(self)
+        if self._waits:
+            root_module._blocked.add(self)
+        else:
+            root_module._blocked.discard(self)
+
+    def _check_deadlock(self) -> None:
+        root_module = self._get_root_module()
+        if (
+            not root_module._detect_deadlocks
+            or not root_module._starting_up
+            or root_module._exit.is_set()
+            or root_module._running
+            or not root_module._blocked
+        ):
+            return
+        for module in root_module._blocked:
+            contexts = module._get_contexts()
+            if all(_is_published(contexts, *wait) for wait in module._waits):
+                # the module is about to resume
+                return
+        report = find_deadlock(root_module, root_module._phase)
+        if report is not None:
+            log.critical("Modules are deadlocked", phase=root_module._phase)
+            root_module._exceptions.append(RuntimeError(report))
+            root_module._exit.set()
+
+    def _get_contexts(self) -> list[Context]:
+        contexts = [self._context]
+        if self.parent is not None:
+            contexts.append(self.parent._context)
+        return contexts
+
     async def __aenter__(self) -> Module:
         self._check_init()
         log.debug("Running root module", name=self.path)
         initialize(self)
+        if self._dependency_file is not None:
+            load_dependencies(self, self._dependency_file)
+        graph = build_graph(self)
+        waves = get_waves(graph)
+        for module, producers in graph.items():
+            module._producers = producers
+        mark_dormant_modules(self)
+        for module in graph:
+            module._lazy_producers = get_lazy_producers(module)
+        has_dependencies = any(graph.values())
+        if has_dependencies:
+            log.debug(
+                "Module dependency waves",
+                waves=[[module.path for module in wave] for wave in waves],
+            )
         async with AsyncExitStack() as exit_stack:
             self._task_group = await exit_stack.enter_async_context(create_task_group())
             self._exceptions = []
+            self._starting_up = True
             self._phase = "preparing"
             if self._global_start_timeout is None:
                 prepare_timeout = self._prepare_timeout
@@ -347,7 +846,7 @@ class Module:
             t0 = time()
             with move_on_after(prepare_timeout) as scope:
                 self._task_group.start_soon(self._prepare, name=f"{self.path} _prepare")
-                await self._all_prepared()
+                await self._wait_or_exit(self._all_prepared)
             if scope.cancelled_caught:
                 self._get_all_prepare_timeout()
             if self._exceptions:
@@ -361,13 +860,20 @@ class Module:
                     start_timeout = max(self._global_start_timeout - elapsed_time, 0)
                 with move_on_after(start_timeout) as scope:
                     self._task_group.start_soon(self._start, name=f"{self.path} start")
-                    await self._all_started()
+                    await self._wait_or_exit(self._all_started)
                 if scope.cancelled_caught:
                     self._get_all_start_timeout()
                 if self._exceptions:
                     self._exit.set()
+                # values may be published at any time once the application is running
+                self._starting_up = False
                 if not self._exit.is_set():
+                    if has_dependencies:
+                        self._log_critical_path(graph, waves)
+                    if self._dependency_file is not None:
+                        save_dependencies(self, self._dependency_file)
                     log.debug("Application running")
+                    application_running()
             self._exit_stack = exit_stack.pop_all()
         return self
 
@@ -395,6 +901,24 @@ class Module:
                 log.critical("Exception", exc_info=exception)
         log.debug("Application stopped")
 
+    def _log_critical_path(
+        self, graph: dict[Module, list[Module]], waves: list[list[Module]]
+    ) -> None:
+        critical_path = get_critical_path(graph, waves)
+        duration = sum(sum(module._durations.values()) for module in critical_path)
+        log.info(
+            "Startup critical path",
+            modules=[module.path for module in critical_path],
+            duration=duration,
+        )
+        for module in critical_path:
+            log.info(
+                "Startup critical path module",
+                path=module.path,
+                prepare_duration=module._durations.get("prepare", 0),
+                start_duration=module._durations.get("start", 0),
+            )
+
     def context_manager(self, value):
         self._context_manager_exits.append(value.__exit__)
         return value.__enter__()
@@ -403,8 +927,11 @@ class Module:
         self._context_manager_exits.append(value.__aexit__)
         return await value.__aenter__()
 
+    def _get_active_modules(self) -> list[Module]:
+        return [module for module in self._modules.values() if not module._dormant]
+
     def _get_all_prepare_timeout(self):
-        for module in self._modules.values():
+        for module in self._get_active_modules():
             module._get_all_prepare_timeout()
         if not self.prepared.is_set() and not self._exit.is_set():
             self._exceptions.append(
@@ -412,7 +939,7 @@ class Module:
             )
 
     def _get_all_start_timeout(self):
-        for module in self._modules.values():
+        for module in self._get_active_modules():
             module._get_all_start_timeout()
         if not self.started.is_set() and not self._exit.is_set():
             self._exceptions.append(
@@ -420,7 +947,7 @@ class Module:
             )
 
     def _get_all_stop_timeout(self):
-        for module in self._modules.values():
+        for module in self._get_active_modules():
             module._get_all_stop_timeout()
         if not self.stopped.is_set() and not self._exit.is_set():
             self._exceptions.append(
@@ -428,17 +955,17 @@ class Module:
             )
 
     async def _all_prepared(self):
-        for module in self._modules.values():
+        for module in self._get_active_modules():
             await module._all_prepared()
         await self.prepared.wait()
 
     async def _all_started(self):
-        for module in self._modules.values():
+        for module in self._get_active_modules():
             await module._all_started()
         await self.started.wait()
 
     async def _all_stopped(self):
-        for module in self._modules.values():
+        for module in self._get_active_modules():
             await module._all_stopped()
         await self.stopped.wait()
 
@@ -459,27 +986,45 @@ class Module:
         ```
         """
         if self._phase == "preparing":
+            self._durations["prepare"] = perf_counter() - self._phase_t0
+            end_span("prepare", self.path, self._phase_t0)
             self.prepared.set()
             log.debug("Module prepared", path=self.path)
+            self._update_running()
+            self._check_deadlock()
         elif self._phase == "starting":
+            self._durations["start"] = perf_counter() - self._phase_t0
+            end_span("start", self.path, self._phase_t0)
             self.started.set()
             log.debug("Module started", path=self.path)
+            self._update_running()
+            self._check_deadlock()
         else:
             self._is_stopping = True
             self._task_group.start_soon(self._finish)
 
     async def _finish(self):
+        await self._wait_or_exit(self._drop_and_wait_values)
+
+    async def _wait_or_exit(self, aw: Callable[[], Awaitable[None]]) -> None:
         async def wait_and_cancel(aw: Callable[[], Awaitable[None]]):
             await aw()
             tg.cancel_scope.cancel()
 
         async with create_task_group() as tg:
-            tg.start_soon(wait_and_cancel, self._drop_and_wait_values)
+            tg.start_soon(wait_and_cancel, aw)
             tg.start_soon(wait_and_cancel, self._exit.wait)
 
     async def _drop_and_wait_values(self):
         self.drop_all()
         await self._context.aclose()
+        for callback, duration in self._context.teardown_timings:
+            log.debug(
+                "Module teardown callback",
+                path=self.path,
+                callback=callback,
+                duration=duration,
+            )
         self.stopped.set()
         log.debug("Module stopped", path=self.path)
 
@@ -488,6 +1033,9 @@ class Module:
         try:
             async with create_task_group() as tg:
                 for module in self._modules.values():
+                    if module.lazy:
+                        # prepared when activated
+                        continue
                     module._task_group = tg
                     module._phase = self._phase
                     module._exceptions = self._exceptions
@@ -501,9 +1049,27 @@ class Module:
             log.critical("Module failed while preparing", path=self.path)
 
     async def _prepare_and_done(self) -> None:
-        await self.prepare()
+        for producer in self._producers:
+            producer._activate()
+            await producer.prepared.wait()
+        # the phase's span ends when the module is done with it
+        self._phase_t0 = perf_counter()
+        self._in_phase = True
+        self._update_running()
+        try:
+            await self.prepare()
+        except BaseException:
+            if not self.prepared.is_set():
+                end_span("prepare", self.path, self._phase_t0)
+            raise
+        finally:
+            self._in_phase = False
+            self._update_running()
         if not self.prepared.is_set():
             self.done()
+        else:
+            # the module cannot publish values from its background tasks anymore
+            self._check_deadlock()
 
     async def prepare(self) -> None:
         """
@@ -512,23 +1078,131 @@ class Module:
         pass
 
     async def _start(self) -> None:
-        log.debug("Starting module", path=self.path)
-        try:
-            async with create_task_group() as tg:
-                for module in self._modules.values():
-                    module._task_group = tg
-                    module._phase = self._phase
-                    tg.start_soon(module._start, name=f"{module.path} _start")
-                tg.start_soon(self._start_and_done, name=f"{self.path} _start_and_done")
-        except ExceptionGroup as exc:
-            self._exceptions.append(*exc.exceptions)
+        while True:
+            log.debug("Starting module", path=self.path)
+            try:
+                async with create_task_group() as tg:
+                    for module in self._modules.values():
+                        if module.lazy:
+                            # started when activated
+                            continue
+                        module._task_group = tg
+                        module._phase = self._phase
+                        tg.start_soon(module._start, name=f"{module.path} _start")
+                    tg.start_soon(
+                        self._start_and_done, name=f"{self.path} _start_and_done"
+                    )
+            except ExceptionGroup as exc:
+                if self._can_restart():
+                    await self._restart(exc.exceptions[0])
+                    if not self._exit.is_set():
+                        continue
+                else:
+                    self._exceptions.append(*exc.exceptions)
+                    self._exit.set()
+                    log.critical("Module failed while starting", path=self.path)
+            return
+
+    def _can_restart(self) -> bool:
+        if self.restart == "never" or self._exit.is_set():
+            return False
+        now = time()
+        self._restart_times = [
+            restart_time
+            for restart_time in self._restart_times
+            if now - restart_time < self.restart_window
+        ]
+        if len(self._restart_times) >= self.max_restarts:
+            log.critical(
+                "Module failed too many times",
+                path=self.path,
+                restarts=len(self._restart_times),
+                window=self.restart_window,
+            )
+            return False
+        return True
+
+    async def _restart(self, exc: BaseException) -> None:
+        delay = self.restart_backoff * 2 ** len(self._restart_times)
+        self._restart_times.append(time())
+        log.warning(
+            "Module failed, restarting", path=self.path, delay=delay, exc_info=exc
+        )
+        # stop the submodules before their parents
+        for module in get_all_modules(self)[::-1]:
+            if not module._dormant:
+                await module._reset(exc)
+        for module in get_all_modules(self)[1:]:
+            assert module.parent is not None
+            module._dormant = module.lazy or module.parent._dormant
+        await self._wait_or_exit(partial(sleep, delay))
+        if self._exit.is_set():
+            return
+        root_module = self._get_root_module()
+        self._phase = "preparing"
+        with move_on_after(self._prepare_timeout) as scope:
+            root_module._task_group.start_soon(
+                self._prepare, name=f"{self.path} _prepare"
+            )
+            await self._wait_or_exit(self._all_prepared)
+        if scope.cancelled_caught:
+            self._get_all_prepare_timeout()
             self._exit.set()
-            log.critical("Module failed while starting", path=self.path)
+        self._phase = "starting"
+        log.debug("Module restarting", path=self.path)
+
+    async def _reset(self, exc: BaseException) -> None:
+        # stop the module, and withdraw what it published and borrowed
+        with move_on_after(self._stop_timeout):
+            try:
+                for context_manager_exit in self._context_manager_exits[::-1]:
+                    await self._exit_context_manager(context_manager_exit)
+                await self.stop()
+                teardown_callbacks = self._context._teardown_callbacks[::-1]
+                for callback, _ in teardown_callbacks:
+                    await self._context._call_teardown_callback(callback, exc)
+            except Exception:
+                log.exception(
+                    "Module failed while stopping for restart", path=self.path
+                )
+        self._context_manager_exits = []
+        self._context._teardown_callbacks = []
+        self.drop_all()
+        self._acquired_values = {}
+        root_module = self._get_root_module()
+        for shared_value in self._published_values.values():
+            self._context._remove_shared_value(shared_value)
+            if self.parent is not None:
+                self.parent._context._remove_shared_value(shared_value)
+            # torn down when its current borrowers have dropped it
+            root_module._task_group.start_soon(shared_value.aclose)
+        self._published_values = {}
+        if self._prepared.is_set():
+            self._prepared = Event()
+        if self._started.is_set():
+            self._started = Event()
 
     async def _start_and_done(self) -> None:
-        await self.start()
+        for producer in self._producers:
+            await producer.started.wait()
+        # the phase's span ends when the module is done with it
+        self._phase_t0 = perf_counter()
+        self._in_phase = True
+        self._update_running()
+        try:
+            await self.start()
+        except BaseException:
+            if not self.started.is_set():
+                end_span("start", self.path, self._phase_t0)
+            raise
+        finally:
+            self._in_phase = False
+            self._update_running()
         if not self.started.is_set():
             self.done()
+        else:
+            # the module cannot publish values from its background tasks anymore
+            self._check_deadlock()
 
     async def start(self) -> None:
         """
@@ -542,22 +1216,35 @@ class Module:
         log.debug("Stopping module", path=self.path)
         try:
             async with create_task_group() as tg:
-                for module in self._modules.values():
+                for module in self._get_active_modules():
                     module._task_group = tg
                     module._phase = self._phase
                     tg.start_soon(module._stop, name=f"{module.path} _stop")
+                # context managers may depend on the ones entered before them,
+                # even when tearing down concurrently
                 for context_manager_exit in self._context_manager_exits[::-1]:
-                    res = context_manager_exit(None, None, None)
-                    if isawaitable(res):
-                        await res
+                    await self._exit_context_manager(context_manager_exit)
                 tg.start_soon(self._stop_and_done, name=f"{self.path} _stop_and_done")
         except ExceptionGroup as exc:
             self._exceptions.append(*exc.exceptions)
             self._exit.set()
             log.critical("Module failed while stopping", path=self.path)
 
+    async def _exit_context_manager(self, context_manager_exit: Callable) -> None:
+        t0 = time()
+        res = context_manager_exit(None, None, None)
+        if isawaitable(res):
+            await res
+        log.debug(
+            "Module context manager exited",
+            path=self.path,
+            context_manager_exit=context_manager_exit,
+            duration=time() - t0,
+        )
+
     async def _stop_and_done(self) -> None:
-        await self.stop()
+        with span("stop", self.path):
+            await self.stop()
         if not self._is_stopping:
             self.done()
 
@@ -591,12 +1278,16 @@ class Module:
             raise
 
 
-def initialize(root_module: Module) -> dict[str, Any] | None:
+def initialize(
+    root_module: Module, parallel_imports: bool = False
+) -> dict[str, Any] | None:
     """
     Initialize the root module and all its submodules recursively.
 
     Args:
         root_module: The root module to initialize.
+        parallel_imports: Whether to first import the module types of the configuration
+            concurrently, in a thread pool, before instantiating the modules in order.
 
     Returns:
         The configuration of the application.
@@ -608,12 +1299,15 @@ def initialize(root_module: Module) -> dict[str, Any] | None:
     _config = get_kwargs_with_default(type(root_module).__init__)
     _config.update(root_module._config)
     config = {root_module.name: {"modules": {}, "config": _config}}
-    _initialize(
-        root_module._uninitialized_modules,
-        root_module,
-        root_module._uninitialized_modules,
-        config[root_module.name]["modules"],
-    )
+    with span("initialize", "fps"):
+        if parallel_imports:
+            prefetch_imports(_get_module_types(root_module._uninitialized_modules))
+        _initialize(
+            root_module._uninitialized_modules,
+            root_module,
+            root_module._uninitialized_modules,
+            config[root_module.name]["modules"],
+        )
     root_module._uninitialized_modules = {}
     root_module._initialized = True
     root_module._config = {}
@@ -642,7 +1336,8 @@ def _initialize(
         config[name] = {"config": _config, "modules": {}}
         _config.update(submodule_config)
         try:
-            submodule_instance: Module = module_type(name, **submodule_config)
+            with span("instantiate", "fps", f"{parent_module.path}.{name}"):
+                submodule_instance: Module = module_type(name, **submodule_config)
         except Exception as e:
             raise RuntimeError(
                 f"Cannot instantiate module '{parent_module.path}.{name}': {e}"
@@ -658,6 +1353,23 @@ def _initialize(
         submodule_instance._uninitialized_modules = {}
 
 
+def _is_published(
+    contexts: list[Context], value_type: type, key: Hashable = None
+) -> bool:
+    try:
+        return _find_shared_value(contexts, value_type, key) is not None
+    except RuntimeError:
+        # borrowing will fail
+        return True
+
+
+def _get_module_types(modules: dict[str, Any]) -> Iterator[Any]:
+    for info in modules.values():
+        if "type" in info:
+            yield info["type"]
+        yield from _get_module_types(info.get("modules", {}))
+
+
 def get_kwargs_with_default(function: Callable[..., Any]) -> dict[str, Any]:
     """
     Get the keyword arguments which have a default value from a function.
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from time import perf_counter
+from typing import Any
+
+_tracer: Tracer | None = None
+_until_running_path: str | None = None
+_no_span = nullcontext()
+
+
+class Tracer:
+    """
+    A tracer records spans of time in the trace event format, which can be opened in
+    [Perfetto](https://ui.perfetto.dev) or `chrome://tracing`. Each module has its own
+    track, and FPS itself (initialization and imports) uses the "fps" track.
+    """
+
+    def __init__(self) -> None:
+        self._t0 = perf_counter()
+        self._pid = os.getpid()
+        self._tids: dict[str, int] = {}
+        self._events: list[dict[str, Any]] = []
+
+    def add_span(
+        self, name: str, track: str, start: float, end: float, target: Any = None
+    ) -> None:
+        """
+        Add a span to the trace.
+
+        Args:
+            name: The name of the span.
+            track: The track the span is shown in.
+            start: The time (as given by `time.perf_counter()`) at which the span started.
+            end: The time (as given by `time.perf_counter()`) at which the span ended.
+            target: What the span applies to (e.g. a type), which is added to its name.
+        """
+        if target is not None:
+            name = f"{name} {_describe(target)}"
+        self._events.append(
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._t0) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": self._pid,
+                "tid": self._get_tid(track),
+            }
+        )
+
+    def save(self, path: str) -> None:
+        """
+        Save the trace to a file.
+
+        Args:
+            path: The path to the file.
+        """
+        import json
+
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": tid,
+                "args": {"name": track},
+            }
+            for track, tid in self._tids.items()
+        ]
+        events.extend(self._events)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def _get_tid(self, track: str) -> int:
+        tid = self._tids.get(track)
+        if tid is None:
+            tid = self._tids[track] = len(self._tids) + 1
+        return tid
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_track", "_target", "_start")
+
+    def __init__(self, tracer: Tracer, name: str, track: str, target: Any) -> None:
+        self._tracer = tracer
+        self._name = name
+        self._track = track
+        self._target = target
+
+    def __enter__(self) -> None:
+        self._start = perf_counter()
+
+    def __exit__(self, exc_type, exc_value, exc_tb) -> None:
+        self._tracer.add_span(
+            self._name, self._track, self._start, perf_counter(), self._target
+        )
+
+
+def span(name: str, track: str, target: Any = None) -> AbstractContextManager[None]:
+    """
+    Record the time spent in a `with` block, if tracing is enabled.
+
+    Args:
+        name: The name of the span.
+        track: The track the span is shown in.
+        target: What the span applies to (e.g. a type), which is added to its name.
+
+    Returns:
+        A context manager, which does nothing if tracing is not enabled.
+    """
+    if _tracer is None:
+        return _no_span
+    return _Span(_tracer, name, track, target)
+
+
+def end_span(name: str, track: str, start: float) -> None:
+    """
+    Record a span which ends now, if tracing is enabled.
+
+    Args:
+        name: The name of the span.
+        track: The track the span is shown in.
+        start: The time (as given by `time.perf_counter()`) at which the span started.
+    """
+    if _tracer is not None:
+        _tracer.add_span(name, track, start, perf_counter())
+
+
+@contextmanager
+def trace_startup(path: str, until_running: bool = False) -> Iterator[Tracer]:
+    """
+    Trace the modules' phases, the values they wait for, their initialization and
+    the imports, and save the trace when exiting the `with` block, in the trace event
+    format which can be opened in [Perfetto](https://ui.perfetto.dev) or
+    `chrome://tracing`:
+    ```py
+    from fps import get_root_module, trace_startup
+
+    with trace_startup("trace.json"):
+        root_module = get_root_module(config)
+        root_module.run()
+    ```
+
+    Args:
+        path: The path to the file to save the trace to.
+        until_running: Whether to stop tracing and save the trace as soon as the
+            application is running, instead of when exiting the `with` block (which
+            includes the "stop" phase).
+
+    Returns:
+        The tracer.
+    """
+    global _tracer, _until_running_path
+    tracer = _tracer = Tracer()
+    _until_running_path = path if until_running else None
+    try:
+        yield tracer
+    finally:
+        if _tracer is tracer:
+            _tracer = None
+            _until_running_path = None
+            tracer.save(path)
+
+
+def application_running() -> None:
+    """
+    Stop tracing and save the trace if it was requested once the application is running.
+    """
+    global _tracer, _until_running_path
+    if _tracer is not None and _until_running_path is not None:
+        _tracer.save(_until_running_path)
+        _tracer = None
+        _until_running_path = None
+
+
+def _describe(target: Any) -> str:
+    if isinstance(target, tuple):
+        return ", ".join(_describe(_target) for _target in target)
+    if isinstance(target, type):
+        return f"{target.__module__}.{target.__qualname__}"
+    return str(target)
@@ -1,19 +1,18 @@
 from __future__ import annotations
 
-import json
 import sys
 import click
-import structlog
+from contextlib import nullcontext
 from typing import TextIO
 
-from .._config import dump_config, get_config_description, get_root_module
-from .._module import initialize
-from .._importer import import_from_string
+from .._importer import import_from_string, set_entry_points_cache
+from .._logging import configure_logging, get_logger
+from .._trace import trace_startup
 
 
 sys.path.insert(0, "")
 
-log = structlog.get_logger()
+log = get_logger(__name__)
 CONFIG = None
 TEST = False
 
@@ -56,6 +55,38 @@ TEST = False
     default=1,
     help="The timeout for stopping the module (in seconds).",
 )
+@click.option(
+    "--trace-startup",
+    "trace_path",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="The path to a file to save a trace of the application's startup to, "
+    "once it is running (in the trace event format, see https://ui.perfetto.dev).",
+)
+@click.option(
+    "--parallel-imports",
+    is_flag=True,
+    show_default=True,
+    default=False,
+    help="Import the modules of the configuration concurrently before instantiating them.",
+)
+@click.option(
+    "--entry-points-cache",
+    "entry_points_cache",
+    type=click.Path(dir_okay=False),
+    default=None,
+    envvar="FPS_ENTRY_POINTS_CACHE",
+    help="The path to a file to cache the modules' entry-points in.",
+)
+@click.option(
+    "--log-level",
+    type=click.Choice(
+        ["debug", "info", "warning", "error", "critical"], case_sensitive=False
+    ),
+    default=None,
+    envvar="FPS_LOG_LEVEL",
+    help="The logging level (info by default).",
+)
 @click.argument("module", default="")
 def main(
     module: str,
@@ -66,8 +97,15 @@ def main(
     backend: str = "asyncio",
     timeout: float | None = None,
     stop_timeout: float = 1,
+    trace_path: str | None = None,
+    parallel_imports: bool = False,
+    entry_points_cache: str | None = None,
+    log_level: str | None = None,
 ):
     global CONFIG
+    if log_level is not None:
+        configure_logging(log_level)
+    set_entry_points_cache(entry_points_cache)
     if config is None:
         module_type = import_from_string(module)
         root_module_name = "root_module"
@@ -77,6 +115,8 @@ def main(
             }
         }
     else:
+        import json
+
         config_dict = json.loads(config.read())
         if module:
             config_dict = {module: config_dict[module]}
@@ -101,21 +141,30 @@ def main(
     if TEST:
         CONFIG = config_dict
         return
-    root_module = get_root_module(config_dict)
-    root_module._global_start_timeout = timeout
-    root_module._stop_timeout = stop_timeout
-    actual_config = initialize(root_module)
-    if help_all:
-        click.echo(get_config_description(root_module))
-        return
-    if show_config:
-        assert actual_config is not None
-        config_str = dump_config(actual_config)
-        for line in config_str.splitlines():
-            param_path, param_value = line.split("=")
-            kwargs = {param_path: param_value}
-            log.info("Configuration", **kwargs)
-    root_module.run(backend=backend)
+    # only import the application framework when running the application
+    from .._config import dump_config, get_config_description, get_root_module
+    from .._module import initialize
+
+    with (
+        trace_startup(trace_path, until_running=True)
+        if trace_path is not None
+        else nullcontext()
+    ):
+        root_module = get_root_module(config_dict)
+        root_module._global_start_timeout = timeout
+        root_module._stop_timeout = stop_timeout
+        actual_config = initialize(root_module, parallel_imports=parallel_imports)
+        if help_all:
+            click.echo(get_config_description(root_module))
+            return
+        if show_config:
+            assert actual_config is not None
+            config_str = dump_config(actual_config)
+            for line in config_str.splitlines():
+                param_path, param_value = line.split("=")
+                kwargs = {param_path: param_value}
+                log.info("Configuration", **kwargs)
+        root_module.run(backend=backend)
 
 
 def get_config():
@@ -2,6 +2,12 @@ from socket import socket
 
 import pytest
 
+from fps._logging import configure_logging
+
+# FPS sets up logging the first time it logs, which would otherwise depend on the order
+# of the tests (e.g. if it first logs while logs are captured)
+configure_logging()
+
 
 @pytest.fixture
 def unused_tcp_port() -> int:
@@ -1,8 +1,11 @@
 import json
 
 import fps
+from anyio import create_task_group, sleep
 from click.testing import CliRunner
 from fps import Module
+from fps._importer import set_entry_points_cache
+from fps._logging import configure_logging, is_debug_enabled
 from fps.cli._cli import get_config, main
 from pydantic import BaseModel, Field
 from structlog.testing import capture_logs
@@ -34,6 +37,17 @@ class UselessModule(Module):
         self.exit_app()
 
 
+class RunningModule(Module):
+    async def start(self):
+        async with create_task_group() as tg:
+            tg.start_soon(self.exit_later)
+            self.done()
+
+    async def exit_later(self):
+        await sleep(0.1)
+        self.exit_app()
+
+
 def test_wrong_cli_1():
     runner = CliRunner()
     result = runner.invoke(
@@ -317,3 +331,54 @@ def test_cli_run_module():
         ],
     )
     assert result.exit_code == 0
+
+
+def test_cli_trace_startup(tmp_path):
+    fps.cli._cli.TEST = False
+    trace_path = tmp_path / "trace.json"
+    runner = CliRunner()
+    result = runner.invoke(
+        main,
+        [
+            "test_cli:RunningModule",
+            "--trace-startup",
+            str(trace_path),
+        ],
+    )
+    assert result.exit_code == 0
+    trace = json.loads(trace_path.read_text())
+    names = {event["name"] for event in trace["traceEvents"] if event["ph"] == "X"}
+    # the trace is saved once the application is running
+    assert names == {"initialize", "prepare", "start"}
+
+
+def test_cli_entry_points_cache(tmp_path):
+    cache_path = tmp_path / "entry_points.json"
+    runner = CliRunner()
+    fps.cli._cli.TEST = True
+    try:
+        result = runner.invoke(
+            main,
+            ["fps_module"],
+            env={"FPS_ENTRY_POINTS_CACHE": str(cache_path)},
+        )
+    finally:
+        fps.cli._cli.TEST = False
+        set_entry_points_cache(None)
+    assert result.exit_code == 0
+    assert get_config()["root_module"]["type"] is Module
+    cache = json.loads(cache_path.read_text())
+    assert cache["entry_points"]["fps_module"] == "fps:Module"
+
+
+def test_cli_log_level():
+    runner = CliRunner()
+    fps.cli._cli.TEST = True
+    try:
+        result = runner.invoke(main, ["fps_module", "--log-level", "DEBUG"])
+        assert result.exit_code == 0
+        assert is_debug_enabled()
+    finally:
+        fps.cli._cli.TEST = False
+        configure_logging()
+    assert not is_debug_enabled()
@@ -457,3 +457,61 @@ def test_dump_config():
             },
         }
     }
+
+
+def test_parallel_imports(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for package in ("parallel_a", "parallel_b", "parallel_c", "parallel_d"):
+        (tmp_path / package).mkdir()
+        (tmp_path / package / "__init__.py").write_text("")
+        (tmp_path / package / "modules.py").write_text(
+            "from threading import current_thread\n"
+            "from fps import Module\n"
+            "thread_name = current_thread().name\n"
+            "class MyModule(Module):\n"
+            "    pass\n"
+        )
+    (tmp_path / "parallel_c" / "broken.py").write_text("raise RuntimeError('broken')\n")
+
+    config = {
+        "root": {
+            "type": Module,
+            "modules": {
+                "a": {
+                    "type": "parallel_a.modules:MyModule",
+                    "modules": {
+                        "b": {"type": "parallel_b.modules:MyModule"},
+                        "fps": {"type": "fps_module"},
+                        "unknown": {"type": "no_entry_point"},
+                    },
+                },
+                "c": {"type": "parallel_c.modules:MyModule"},
+                "d": {"type": Module},
+            },
+        }
+    }
+    root = get_root_module(config)
+    with pytest.raises(RuntimeError, match="no_entry_point"):
+        initialize(root, parallel_imports=True)
+
+    import parallel_a.modules
+    import parallel_b.modules
+
+    # the modules were imported in a thread pool
+    assert parallel_a.modules.thread_name != "MainThread"
+    assert parallel_b.modules.thread_name != "MainThread"
+
+    del config["root"]["modules"]["a"]["modules"]["unknown"]
+    config["root"]["modules"]["e"] = {"type": "parallel_c.broken:MyModule"}
+    config["root"]["modules"]["f"] = {"type": "parallel_d.modules:MyModule"}
+    root = get_root_module(config)
+    with pytest.raises(RuntimeError, match="broken"):
+        initialize(root, parallel_imports=True)
+
+    del config["root"]["modules"]["e"]
+    del config["root"]["modules"]["f"]
+    root = get_root_module(config)
+    initialize(root, parallel_imports=True)
+    assert list(root.modules) == ["a", "c", "d"]
+    assert list(root.modules["a"].modules) == ["b", "fps"]
+    assert type(root.modules["a"].modules["b"]) is parallel_b.modules.MyModule
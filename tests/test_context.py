@@ -1,7 +1,23 @@
+import gc
+import threading
+import weakref
+from abc import ABC
+from functools import partial
+from time import perf_counter
+
 import pytest
 
-from anyio import create_task_group, fail_after, sleep
-from fps import Context, SharedValue, get, get_nowait, put
+from anyio import (
+    CancelScope,
+    CapacityLimiter,
+    create_task_group,
+    fail_after,
+    sleep,
+    to_thread,
+    wait_all_tasks_blocked,
+)
+from fps import Context, SharedValue, SharedValuePool, get, get_nowait, put
+from structlog.testing import capture_logs
 
 pytestmark = pytest.mark.anyio
 
@@ -45,6 +61,10 @@ async def test_context():
         await context.get(int)
     assert str(excinfo.value) == "Context is closed"
 
+    with pytest.raises(RuntimeError) as excinfo:
+        context.get_nowait(int)
+    assert str(excinfo.value) == "Shared value not found or cannot be borrowed"
+
 
 async def test_nested_contexts():
     async with Context():
@@ -80,6 +100,25 @@ async def test_nested_contexts_get_nowait():
                     assert published_value_0 is acquired_value_1
 
 
+async def test_nested_contexts_get_nowait_fallback():
+    async with Context() as parent:
+        parent.put("foo")
+        async with Context() as child:
+            child.put("bar", max_borrowers=0)
+            async with Context() as grandchild:
+                # the nearest value cannot be borrowed, the one further up is borrowed
+                with grandchild.get_nowait(str) as value:
+                    assert value == "foo"
+                with pytest.raises(
+                    RuntimeError, match="Shared value not found or cannot be borrowed"
+                ):
+                    grandchild.get_nowait(int)
+                # putting a value invalidates the cached lookups
+                parent.put(1)
+                with grandchild.get_nowait(int) as value:
+                    assert value == 1
+
+
 async def test_context_cm():
     async with Context() as context:
         context.put("foo")
@@ -158,3 +197,856 @@ async def test_value_max_borrowers():
 
         acquired_value1.drop()
         acquired_value2.drop()
+
+
+async def test_put_only_wakes_matching_waiters():
+    woken = []
+
+    async with Context() as context, create_task_group() as tg:
+
+        async def get_value(value_type):
+            value = await context.get(value_type)
+            woken.append(value_type)
+            value.drop()
+
+        tg.start_soon(get_value, int)
+        tg.start_soon(get_value, str)
+        tg.start_soon(get_value, str)
+        await sleep(0.01)
+        assert set(context._waiters) == {(id(int), None), (id(str), None)}
+        assert len(context._waiters[(id(str), None)]) == 2
+
+        context.put("foo")
+        await sleep(0.01)
+        assert woken == [str, str]
+        assert set(context._waiters) == {(id(int), None)}
+
+        context.put(1)
+        await sleep(0.01)
+        assert woken == [str, str, int]
+        assert not context._waiters
+
+
+async def test_get_waits_in_all_ancestors():
+    async with Context() as parent, create_task_group() as tg:
+        async with Context() as child:
+            values = []
+
+            async def get_value():
+                values.append(await child.get(str))
+
+            tg.start_soon(get_value)
+            await sleep(0.01)
+            assert set(child._waiters) == {(id(str), None)}
+            assert set(parent._waiters) == {(id(str), None)}
+
+            parent.put("foo")
+            await sleep(0.01)
+            assert values[0].unwrap() == "foo"
+            assert not child._waiters
+            assert not parent._waiters
+            values[0].drop()
+
+            child.put("bar")
+            with await child.get(str) as value:
+                assert value == "bar"
+
+
+async def test_get_timeout():
+    async with Context() as context:
+        with pytest.raises(TimeoutError):
+            await context.get(str, timeout=0.01)
+        assert not context._waiters
+
+
+async def test_value_max_borrowers_fifo():
+    order = []
+
+    async with (
+        SharedValue("foo", max_borrowers=1) as shared_value,
+        create_task_group() as tg,
+    ):
+        acquired_value = await shared_value.get()
+
+        async def borrow(idx):
+            value = await shared_value.get()
+            order.append(idx)
+            await sleep(0.01)
+            value.drop()
+
+        for idx in range(5):
+            tg.start_soon(borrow, idx)
+            await sleep(0.001)
+
+        statistics = shared_value.statistics()
+        assert statistics.borrowers == 1
+        assert statistics.waiting == 5
+        with pytest.raises(RuntimeError, match="Cannot borrow shared value"):
+            shared_value.get_nowait()
+
+        acquired_value.drop()
+
+    assert order == [0, 1, 2, 3, 4]
+    statistics = shared_value.statistics()
+    assert statistics.borrowers == 0
+    assert statistics.max_borrowers == 1
+    assert statistics.waiting == 0
+    assert statistics.waits == 5
+    assert statistics.max_wait_time >= 0.01
+    assert statistics.total_wait_time >= statistics.max_wait_time
+
+
+async def test_value_max_borrowers_cancelled():
+    async with SharedValue("foo", max_borrowers=1) as shared_value:
+        acquired_value0 = await shared_value.get()
+
+        with pytest.raises(TimeoutError):
+            await shared_value.get(timeout=0.01)
+        assert shared_value.statistics().waiting == 0
+
+        scope = CancelScope()
+
+        async def borrow():
+            with scope:
+                await shared_value.get()
+
+        async with create_task_group() as tg:
+            tg.start_soon(borrow)
+            await wait_all_tasks_blocked()
+            # the borrower is cancelled, but the value is handed over before it resumes
+            scope.cancel()
+            acquired_value0.drop()
+
+        assert scope.cancelled_caught
+        assert shared_value.statistics().borrowers == 0
+        assert shared_value.statistics().waits == 0
+        acquired_value1 = shared_value.get_nowait()
+        acquired_value1.drop()
+
+
+async def test_pool():
+    created = []
+    torn_down = []
+
+    class Connection:
+        def __init__(self):
+            created.append(self)
+
+    async def teardown_callback(connection, exception):
+        torn_down.append((connection, exception))
+
+    async with Context() as context:
+        pool = context.put_pool(
+            Connection, max_size=2, teardown_callback=teardown_callback
+        )
+        assert pool.size == 0
+
+        with pytest.raises(RuntimeError, match="Cannot borrow shared value"):
+            pool.get_nowait()
+
+        value0 = await context.get(Connection)
+        value1 = await context.get(Connection)
+        assert value0.unwrap() is not value1.unwrap()
+        assert pool.size == 2
+        assert pool.idle == 0
+
+        with pytest.raises(TimeoutError):
+            await context.get(Connection, timeout=0.01)
+
+        connection0 = value0.unwrap()
+        value0.drop()
+        assert pool.idle == 1
+        with context.get_nowait(Connection) as connection:
+            assert connection is connection0
+        value1.drop()
+
+    assert len(created) == 2
+    assert torn_down == [(created[0], None), (created[1], None)]
+
+
+async def test_pool_min_size_and_idle_timeout():
+    torn_down = []
+
+    async def factory():
+        return object()
+
+    def teardown_callback(instance):
+        torn_down.append(instance)
+
+    async with Context() as context:
+        pool = context.put_pool(
+            factory,
+            types=object,
+            min_size=1,
+            idle_timeout=0.01,
+            teardown_callback=teardown_callback,
+        )
+        value0 = await context.get(object)
+        assert pool.size == 1
+        value1 = await context.get(object)
+        assert pool.size == 2
+        instance1 = value1.unwrap()
+        value1.drop()
+        instance0 = value0.unwrap()
+        value0.drop()
+        assert pool.idle == 2
+
+        await sleep(0.02)
+        # the least recently used instance is evicted, but the pool keeps its minimum size
+        value = await context.get(object)
+        assert torn_down == [instance1]
+        assert value.unwrap() is instance0
+        assert pool.size == 1
+        value.drop()
+
+    assert torn_down == [instance1, instance0]
+
+
+async def test_pool_factory_error():
+    def factory():
+        raise RuntimeError("factory error")
+
+    async with Context() as context:
+        pool = context.put_pool(factory, types=object, max_size=1)
+        with pytest.raises(RuntimeError, match="factory error"):
+            await context.get(object)
+        assert pool.size == 0
+        assert pool.statistics().borrowers == 0
+
+
+async def test_pool_errors():
+    async with Context() as context:
+        with pytest.raises(
+            RuntimeError, match="Types must be provided if the factory is not a type"
+        ):
+            context.put_pool(lambda: 0)
+
+        with pytest.raises(
+            RuntimeError,
+            match="The minimum size of the pool exceeds its maximum size",
+        ):
+            context.put_pool(int, min_size=2, max_size=1)
+
+
+async def test_put_factory():
+    built = []
+    torn_down = []
+
+    class Service:
+        pass
+
+    async def factory():
+        await sleep(0.01)
+        service = Service()
+        built.append(service)
+        return service
+
+    def teardown_callback(service, exception):
+        torn_down.append((service, exception))
+
+    async with Context() as context:
+        context.put_factory(factory, Service, teardown_callback=teardown_callback)
+        context.put_factory(list, teardown_callback=teardown_callback)
+        assert not built
+
+        with pytest.raises(RuntimeError, match="cannot be borrowed"):
+            context.get_nowait(Service)
+
+        values = []
+        async with create_task_group() as tg:
+            for _ in range(3):
+
+                async def get_service():
+                    values.append(await context.get(Service))
+
+                tg.start_soon(get_service)
+
+        assert len(built) == 1
+        for value in values:
+            assert value.unwrap() is built[0]
+            value.drop()
+        with context.get_nowait(Service) as service:
+            assert service is built[0]
+
+    # the list was never built, so it is not torn down
+    assert torn_down == [(built[0], None)]
+
+
+async def test_put_factory_get_nowait():
+    async with Context() as context:
+        context.put_factory(list)
+        with context.get_nowait(list) as value0:
+            with await context.get(list) as value1:
+                assert value0 == [] and value0 is value1
+
+        async def factory():
+            return b"foo"
+
+        # a synchronous callable can return an awaitable, which only get() can await
+        context.put_factory(lambda: factory(), bytes)
+        with pytest.raises(RuntimeError, match="cannot be borrowed"):
+            context.get_nowait(bytes)
+        with await context.get(bytes) as value:
+            assert value == b"foo"
+        with context.get_nowait(bytes) as value:
+            assert value == b"foo"
+
+
+async def test_get_many():
+    async with Context() as context, create_task_group() as tg:
+        shared_value = context.put("foo")
+
+        async def put_values():
+            await sleep(0.01)
+            context.put(1)
+            await sleep(0.01)
+            context.put(1.5)
+
+        tg.start_soon(put_values)
+        values = await context.get_many(str, int, float)
+        assert [value.unwrap() for value in values] == ["foo", 1, 1.5]
+        for value in values:
+            value.drop()
+
+        with pytest.raises(TimeoutError):
+            await context.get_many(str, bytes, timeout=0.01)
+        # the value that could be borrowed was dropped
+        assert shared_value.statistics().borrowers == 0
+
+        async def factory():
+            raise RuntimeError("factory error")
+
+        context.put_factory(factory, bytes)
+        with pytest.raises(RuntimeError, match="factory error"):
+            await context.get_many(str, bytes)
+        assert shared_value.statistics().borrowers == 0
+
+    with pytest.raises(RuntimeError, match="Context is closed"):
+        await context.get_many(str)
+
+
+async def test_context_concurrent_teardown():
+    called = []
+
+    async def cb0():
+        await sleep(0.1)
+        called.append("cb0")
+
+    async def cb1():
+        await sleep(0.1)
+        called.append("cb1")
+
+    def cb2():
+        called.append("cb2")
+
+    async with Context(concurrent_teardown=True) as context:
+        context.add_teardown_callback(cb0)
+        context.add_teardown_callback(cb1)
+        context.add_teardown_callback(cb2, after=[cb0])
+        with pytest.raises(RuntimeError, match="Teardown callback not found"):
+            context.add_teardown_callback(cb2, after=[print])
+        t0 = perf_counter()
+
+    assert perf_counter() - t0 < 0.19
+    assert called.index("cb2") > called.index("cb0")
+    timings = dict(context.teardown_timings)
+    assert set(timings) == {cb0, cb1, cb2}
+    assert timings[cb0] >= 0.1
+    assert timings[cb2] < 0.1
+
+
+async def test_put_bases():
+    class Base(ABC):
+        pass
+
+    class Sub0(Base):
+        pass
+
+    class Sub1(Sub0):
+        pass
+
+    class Other(Base):
+        pass
+
+    sub1 = Sub1()
+
+    async with Context() as context, create_task_group() as tg:
+        values = []
+
+        async def get_value(value_type):
+            values.append(await context.get(value_type))
+
+        tg.start_soon(get_value, Sub0)
+        await sleep(0.01)
+        context.put(sub1, bases=True)
+        await sleep(0.01)
+        with values.pop() as value:
+            assert value is sub1
+        with await context.get(Base) as value:
+            assert value is sub1
+        with pytest.raises(RuntimeError, match="cannot be borrowed"):
+            context.get_nowait(object)
+
+        context.put(Other(), bases=True)
+        with pytest.raises(RuntimeError) as excinfo:
+            context.get_nowait(Base)
+        ambiguous = (
+            f'Value type "{Base}" is ambiguous, it is a base class of: '
+            f'"{Sub1}", "{Other}"'
+        )
+        assert str(excinfo.value) == ambiguous
+        with pytest.raises(RuntimeError) as excinfo:
+            await context.get(Base)
+        assert str(excinfo.value) == ambiguous
+
+        # values registered as their exact type take precedence
+        context.put(Sub0(), types=[Base, Sub0])
+        with context.get_nowait(Base) as value:
+            assert type(value) is Sub0
+
+    async with Context() as context:
+        context.put(sub1)
+        with pytest.raises(TimeoutError):
+            await context.get(Sub0, timeout=0.01)
+
+
+async def test_put_key():
+    async with Context() as context, create_task_group() as tg:
+        values = []
+
+        async def get_value(key):
+            values.append(await context.get(dict, key=key))
+
+        tg.start_soon(get_value, "users")
+        await sleep(0.01)
+        assert set(context._waiters) == {(id(dict), "users")}
+
+        # putting an unkeyed value or a value with another key doesn't wake the waiter
+        context.put({"name": "default"})
+        context.put({"name": "groups"}, key="groups")
+        await sleep(0.01)
+        assert not values
+
+        context.put({"name": "users"}, key="users")
+        await sleep(0.01)
+        with values.pop() as value:
+            assert value == {"name": "users"}
+        with context.get_nowait(dict, key="groups") as value:
+            assert value == {"name": "groups"}
+        with await context.get(dict) as value:
+            assert value == {"name": "default"}
+        with pytest.raises(RuntimeError, match="cannot be borrowed"):
+            context.get_nowait(dict, key="foo")
+
+        with pytest.raises(RuntimeError) as excinfo:
+            context.put({}, key="users")
+        assert (
+            str(excinfo.value) == f'Value type "{dict}" with key "users" already exists'
+        )
+
+        context.put_factory(list, key="lazy")
+        context.put_pool(set, key="pool")
+        with await context.get(list, key="lazy") as value:
+            assert value == []
+        with await context.get(set, key="pool") as value:
+            assert value == set()
+
+
+async def test_value_exclusive():
+    order = []
+
+    async with (
+        SharedValue("foo") as shared_value,
+        create_task_group() as tg,
+    ):
+        reader0 = await shared_value.get()
+        reader1 = shared_value.get_nowait(mode="shared")
+        with pytest.raises(RuntimeError, match="Cannot borrow shared value"):
+            shared_value.get_nowait(mode="exclusive")
+
+        async def borrow(name, mode):
+            value = await shared_value.get(mode=mode)
+            order.append(name)
+            await sleep(0.01)
+            value.drop()
+
+        tg.start_soon(borrow, "writer", "exclusive")
+        await sleep(0.01)
+        # readers that come after a waiting writer wait in line behind it
+        tg.start_soon(borrow, "reader2", "shared")
+        tg.start_soon(borrow, "reader3", "shared")
+        await sleep(0.01)
+        with pytest.raises(RuntimeError, match="Cannot borrow shared value"):
+            shared_value.get_nowait()
+        assert shared_value.statistics().waiting == 3
+
+        reader0.drop()
+        await sleep(0.01)
+        assert order == []
+        reader1.drop()
+        await wait_all_tasks_blocked()
+        assert order == ["writer"]
+        assert shared_value.statistics().borrowers == 1
+
+        with fail_after(1):
+            await shared_value.freed()
+        # the readers are served together
+        assert order[0] == "writer"
+        assert sorted(order[1:]) == ["reader2", "reader3"]
+
+        with pytest.raises(RuntimeError) as excinfo:
+            await shared_value.get(mode="foo")
+        assert str(excinfo.value) == 'Invalid borrow mode: "foo"'
+
+
+async def test_context_get_exclusive():
+    async with Context() as context:
+        context.put("foo")
+        with await context.get(str, mode="exclusive") as value:
+            assert value == "foo"
+            with pytest.raises(RuntimeError, match="cannot be borrowed"):
+                context.get_nowait(str)
+            with pytest.raises(TimeoutError):
+                await context.get(str, timeout=0.01)
+        with context.get_nowait(str, mode="exclusive") as value:
+            assert value == "foo"
+
+        context.put_factory(list)
+        with await context.get(list, mode="exclusive") as value:
+            assert value == []
+
+
+async def test_compact_objects():
+    async with Context() as context:
+        shared_value = context.put("foo")
+        value = await context.get(str)
+        for obj in (context, shared_value, value):
+            assert not hasattr(obj, "__dict__")
+        value.drop()
+        # dropping twice is a no-op
+        value.drop()
+        assert shared_value.statistics().borrowers == 0
+        # the objects can still be weakly referenced
+        for obj in (context, shared_value, value):
+            assert weakref.ref(obj)() is obj
+
+
+async def test_value_lease():
+    async with SharedValue("foo", max_borrowers=1, lease=0.05) as shared_value:
+        with capture_logs() as cap_logs:
+            value = await shared_value.get()
+            # a waiting borrower reclaims the borrow when its lease expires
+            with fail_after(1):
+                with await shared_value.get() as new_value:
+                    assert new_value == "foo"
+        with pytest.raises(RuntimeError, match="Already dropped"):
+            value.unwrap()
+        # dropping a reclaimed value is a no-op
+        value.drop()
+        assert shared_value.statistics().borrowers == 0
+        assert {
+            "event": "Reclaimed value whose lease expired",
+            "borrower": None,
+            "log_level": "warning",
+        } in cap_logs
+
+        # the lease can be given when borrowing
+        value = shared_value.get_nowait(lease=0.01)
+        await sleep(0.02)
+        with shared_value.get_nowait(lease=float("inf")) as new_value:
+            assert new_value == "foo"
+
+        # freed() reclaims the borrows whose lease has expired
+        value = await shared_value.get()
+        with fail_after(1):
+            await shared_value.freed()
+
+    async with SharedValue("bar") as shared_value:
+        value0 = await shared_value.get()
+        value1 = await shared_value.get(lease=0.01)
+        await sleep(0.02)
+        value2 = shared_value.get_nowait()
+        assert shared_value.statistics().borrowers == 2
+        with pytest.raises(RuntimeError, match="Already dropped"):
+            value1.unwrap()
+        value0.drop()
+        value2.drop()
+
+
+async def test_value_orphan():
+    async with SharedValue("foo", max_borrowers=1) as shared_value:
+        with capture_logs() as cap_logs:
+            await shared_value.get()
+            gc.collect()
+            assert shared_value.statistics().borrowers == 0
+        assert {
+            "event": "Reclaimed value that was not dropped",
+            "borrower": None,
+            "log_level": "warning",
+        } in cap_logs
+        with shared_value.get_nowait() as value:
+            assert value == "foo"
+        # orphaned borrows are reclaimed when borrowing
+        shared_value.get_nowait()
+        with await shared_value.get() as value:
+            assert value == "foo"
+        await shared_value.get()
+        with shared_value.get_nowait() as value:
+            assert value == "foo"
+
+    async with SharedValue("foo") as shared_value:
+        values = [await shared_value.get(), await shared_value.get()]
+
+        async def get_exclusive():
+            with await shared_value.get(mode="exclusive") as value:
+                assert value == "foo"
+
+        async with create_task_group() as tg:
+            tg.start_soon(get_exclusive)
+            await wait_all_tasks_blocked()
+            # the orphaned borrow is reclaimed, but the exclusive borrower must keep waiting
+            del values[0]
+            await wait_all_tasks_blocked()
+            assert shared_value.statistics().waiting == 1
+            values[0].drop()
+
+    async with SharedValue("foo") as shared_value:
+        value = await shared_value.get(lease=0.01)
+        value_ref = value._ref
+        await sleep(0.02)
+        shared_value.get_nowait().drop()
+        # the value is garbage-collected after its lease expired
+        shared_value._record_orphan(value_ref)
+        assert shared_value.statistics().borrowers == 0
+
+
+@pytest.mark.parametrize("worker_thread", (True, False))
+async def test_value_orphan_in_thread(worker_thread):
+    async with SharedValue("foo", max_borrowers=1) as shared_value:
+        values = [await shared_value.get()]
+
+        def orphan():
+            values.clear()
+
+        async with create_task_group() as tg:
+            # the waiting borrower polls for the orphaned borrow, and reclaims it
+            tg.start_soon(shared_value.get)
+            await wait_all_tasks_blocked()
+            with capture_logs() as cap_logs:
+                if worker_thread:
+                    await to_thread.run_sync(orphan)
+                else:
+                    thread = threading.Thread(target=orphan)
+                    thread.start()
+                    await to_thread.run_sync(thread.join)
+                with fail_after(1):
+                    await shared_value.freed()
+
+        assert {
+            "event": "Reclaimed value that was not dropped",
+            "borrower": None,
+            "log_level": "warning",
+        } in cap_logs
+
+
+async def test_pool_lease():
+    async def factory():
+        await sleep(0.05)
+        return object()
+
+    async with SharedValuePool(factory, max_size=1, lease=0.01) as pool:
+        values = []
+
+        async def get_value():
+            values.append(await pool.get())
+
+        # the lease expires while the instance is being created,
+        # and the borrow is reclaimed by a waiting borrower
+        async with create_task_group() as tg:
+            tg.start_soon(get_value)
+            await sleep(0.001)
+            tg.start_soon(get_value)
+        with pytest.raises(RuntimeError, match="Already dropped"):
+            values[0].unwrap()
+        assert pool.idle == 1
+        values[1].drop()
+        value = pool.get_nowait()
+        instance = value.unwrap()
+        await sleep(0.02)
+        # the instance was returned to the pool
+        with await pool.get(lease=float("inf")) as new_instance:
+            assert new_instance is instance
+
+
+async def test_context_lease():
+    async with Context() as context:
+        context.put("foo", lease=0.01)
+        context.put_factory(list, lease=0.01)
+        context.put_pool(dict, max_size=1, lease=0.01)
+        put(1, lease=0.01)
+        value = await context.get(str, mode="exclusive")
+        values = [
+            await context.get(list, mode="exclusive"),
+            await context.get(dict),
+            get_nowait(int, mode="exclusive"),
+        ]
+        with fail_after(1):
+            with await context.get(str, mode="exclusive", lease=1) as new_value:
+                assert new_value == "foo"
+            with await get(list, mode="exclusive", lease=1) as new_value:
+                assert new_value == []
+            with await context.get(dict, lease=1) as new_value:
+                assert new_value == {}
+            with await get(int, mode="exclusive") as new_value:
+                assert new_value == 1
+        await sleep(0.02)
+        with context.get_nowait(str, mode="exclusive", lease=1) as new_value:
+            assert new_value == "foo"
+        for old_value in [value] + values:
+            with pytest.raises(RuntimeError, match="Already dropped"):
+                old_value.unwrap()
+
+
+async def test_value_replace():
+    torn_down = []
+
+    async with create_task_group() as tg:
+        async with SharedValue(
+            "foo", teardown_callback=lambda: torn_down.append("foo")
+        ) as shared_value:
+            old_value = await shared_value.get()
+            assert old_value.generation == 0
+
+            replaced = False
+
+            async def replace():
+                nonlocal replaced
+                await shared_value.replace(
+                    "bar", teardown_callback=lambda: torn_down.append("bar")
+                )
+                replaced = True
+
+            tg.start_soon(replace)
+            await wait_all_tasks_blocked()
+            # new borrowers get the new value right away
+            with await shared_value.get() as new_value:
+                assert new_value == "bar"
+            assert shared_value.get_nowait().generation == 1
+            # existing borrowers keep the old value
+            assert old_value.unwrap() == "foo"
+            assert not replaced
+            assert torn_down == []
+
+            old_value.drop()
+            await wait_all_tasks_blocked()
+            assert replaced
+            assert torn_down == ["foo"]
+            shared_value.get_nowait().drop()
+
+    assert torn_down == ["foo", "bar"]
+
+
+async def test_context_replace():
+    torn_down = []
+
+    async with Context() as context:
+        context.put_factory(list, teardown_callback=torn_down.append)
+        with await context.get(list) as old:
+            pass
+        new = [0]
+        await context.replace(old, new)
+        assert torn_down == [[]]
+        with await context.get(list) as value:
+            assert value is new
+
+        context.put_pool(dict)
+        with pytest.raises(RuntimeError) as excinfo:
+            await context.replace(object(), {})
+        assert str(excinfo.value) == "Value not found"
+        with pytest.raises(RuntimeError) as excinfo:
+            await context._context[(id(dict), None)].replace({})
+        assert str(excinfo.value) == "Cannot replace a pool"
+
+    # the replaced value has no teardown callback
+    assert torn_down == [[]]
+
+
+async def test_get_from_thread():
+    thread_nb = 20
+    borrow_nb = 50
+    max_borrowers = 3
+    borrowers = 0
+    max_seen_borrowers = 0
+    lock = threading.Lock()
+
+    async with Context() as context:
+
+        def worker(idx):
+            nonlocal borrowers, max_seen_borrowers
+            # the int value is published after some threads started waiting for it
+            value = context.get_from_thread(int, key=idx % 2)
+            assert value.unwrap() == idx % 2
+            value.drop_from_thread()
+            for _ in range(borrow_nb):
+                value = context.get_from_thread(str)
+                with lock:
+                    borrowers += 1
+                    max_seen_borrowers = max(max_seen_borrowers, borrowers)
+                assert value.unwrap() == "foo"
+                with lock:
+                    borrowers -= 1
+                value.drop_from_thread()
+
+        shared_value = context.put("foo", max_borrowers=max_borrowers)
+        limiter = CapacityLimiter(thread_nb)
+        async with create_task_group() as tg:
+            for idx in range(thread_nb):
+                tg.start_soon(partial(to_thread.run_sync, worker, idx, limiter=limiter))
+            await sleep(0.01)
+            context.put(0, key=0)
+            context.put(1, key=1)
+
+        statistics = shared_value.statistics()
+        assert statistics.borrowers == 0
+        assert 1 <= max_seen_borrowers <= max_borrowers
+
+
+def test_count_parameters():
+    from fps._context import _parameter_kinds, count_parameters
+
+    def make_callback():
+        def callback(a, b):
+            pass  # pragma: nocover
+
+        return callback
+
+    class Callback:
+        __slots__ = ()
+
+        def __call__(self, a):
+            pass  # pragma: nocover
+
+        def method(self, a, b):
+            pass  # pragma: nocover
+
+        def method_args(*args):
+            pass  # pragma: nocover
+
+    def func_args(a, *args, b=None):
+        pass  # pragma: nocover
+
+    callbacks = [make_callback() for _ in range(10)]
+    assert [count_parameters(callback) for callback in callbacks] == [2] * 10
+    # closures share the same code, and don't stay alive in the cache
+    assert callbacks[0].__code__ in _parameter_kinds
+    size = len(_parameter_kinds)
+    del callbacks
+    assert len(_parameter_kinds) == size
+
+    assert count_parameters(Callback().method) == 2
+    assert count_parameters(Callback().method_args) == 1
+    assert count_parameters(Callback()) == 1
+    assert count_parameters(partial(func_args, 1)) == 2
+    assert count_parameters(partial(func_args, 1, 2, 3)) == 2
+    assert count_parameters(partial(Callback().method, 1)) == 1
+    assert count_parameters(print) == 5
@@ -0,0 +1,539 @@
+import json
+from time import monotonic
+
+import pytest
+from anyio import Event, create_task_group, sleep
+from structlog.testing import capture_logs
+
+from fps import Module
+from fps._graph import find_deadlock
+
+pytestmark = pytest.mark.anyio
+
+
+class Foo:
+    pass
+
+
+class SubFoo(Foo):
+    pass
+
+
+class Bar:
+    pass
+
+
+async def test_declared_dependencies():
+    events = []
+
+    class Producer(Module):
+        provides = (SubFoo,)
+
+        async def prepare(self):
+            await sleep(0.1)
+            events.append("producer prepared")
+
+        async def start(self):
+            await sleep(0.1)
+            self.put(SubFoo(), types=Foo)
+            events.append("producer started")
+
+    class Consumer(Module):
+        provides = (Bar,)
+        requires = (Foo, Bar)
+
+        async def prepare(self):
+            events.append("consumer preparing")
+
+        async def start(self):
+            events.append("consumer starting")
+            self.put(Bar())
+            await self.get(Foo, timeout=0)
+            await self.get(Bar, timeout=0)
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name, prepare_timeout=0.5, start_timeout=0.5)
+            self.add_module(Consumer, "consumer")
+            self.add_module(Producer, "producer")
+
+    with capture_logs() as cap_logs:
+        async with Root("root") as root:
+            pass
+
+    assert not root.exceptions
+    assert events == [
+        "producer prepared",
+        "consumer preparing",
+        "producer started",
+        "consumer starting",
+    ]
+    waves = [log for log in cap_logs if log["event"] == "Module dependency waves"]
+    assert waves[0]["waves"] == [["root", "root.producer"], ["root.consumer"]]
+    critical_path = [log for log in cap_logs if log["event"] == "Startup critical path"]
+    assert critical_path[0]["modules"] == ["root.producer", "root.consumer"]
+    assert critical_path[0]["duration"] >= 0.2
+    modules = [
+        log for log in cap_logs if log["event"] == "Startup critical path module"
+    ]
+    assert [module["path"] for module in modules] == ["root.producer", "root.consumer"]
+    assert modules[0]["prepare_duration"] >= 0.1
+    assert modules[0]["start_duration"] >= 0.1
+
+
+async def test_no_dependencies():
+    class Root(Module):
+        pass
+
+    with capture_logs() as cap_logs:
+        async with Root("root"):
+            pass
+
+    events = [log["event"] for log in cap_logs]
+    assert "Module dependency waves" not in events
+    assert "Startup critical path" not in events
+
+
+async def test_dependency_cycle():
+    started = []
+
+    class Module0(Module):
+        provides = (Foo,)
+        requires = (Bar,)
+
+        async def start(self):
+            started.append(self.path)  # pragma: nocover
+
+    class Module1(Module):
+        provides = (Bar,)
+        requires = (Foo,)
+
+        async def start(self):
+            started.append(self.path)  # pragma: nocover
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Module0, "module0")
+            self.add_module(Module1, "module1")
+
+    with pytest.raises(RuntimeError) as excinfo:
+        async with Root("root"):
+            pass  # pragma: nocover
+
+    assert (
+        str(excinfo.value)
+        == "Module dependency cycle: root.module0 -> root.module1 -> root.module0"
+    )
+    assert not started
+
+
+async def test_missing_producer():
+    class Module0(Module):
+        requires = (Foo,)
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Module0, "module0")
+
+    with pytest.raises(RuntimeError) as excinfo:
+        async with Root("root"):
+            pass  # pragma: nocover
+
+    assert str(excinfo.value) == (
+        f"No module provides {Foo} required by module: root.module0"
+    )
+
+
+async def test_dependency_file(tmp_path):
+    dependency_file = tmp_path / "dependencies.json"
+    events = []
+
+    class Local:
+        pass
+
+    class Producer(Module):
+        async def start(self):
+            await sleep(0.1)
+            self.put(Foo())
+            self.put(Local())
+            events.append("producer started")
+
+    class Consumer(Module):
+        async def start(self):
+            events.append("consumer starting")
+            await self.get(Foo)
+
+    class Root(Module):
+        def __init__(self, name, dependency_file):
+            super().__init__(name, dependency_file=dependency_file)
+            self.add_module(Consumer, "consumer")
+            self.add_module(Producer, "producer")
+
+    # first run: nothing is known, both modules start at once
+    async with Root("root", str(dependency_file)) as root:
+        pass
+
+    assert not root.exceptions
+    assert events == ["consumer starting", "producer started"]
+    foo = f"{Foo.__module__}:Foo"
+    assert json.loads(dependency_file.read_text()) == {
+        "root.consumer": {"provides": [], "requires": [foo]},
+        "root.producer": {"provides": [foo], "requires": []},
+    }
+
+    # second run: the consumer starts after the producer
+    dependencies = json.loads(dependency_file.read_text())
+    dependencies["root.consumer"]["requires"].append("not_a_module:Foo")
+    dependency_file.write_text(json.dumps(dependencies))
+    events.clear()
+    async with Root("root", str(dependency_file)) as root:
+        pass
+
+    assert not root.exceptions
+    assert events == ["producer started", "consumer starting"]
+    assert root.modules["consumer"]._producers == [root.modules["producer"]]
+
+
+async def test_learned_dependency_cycle(tmp_path):
+    dependency_file = tmp_path / "dependencies.json"
+
+    class Module0(Module):
+        async def start(self):
+            self.put(Foo())
+            await self.get(Bar)
+
+    class Module1(Module):
+        async def start(self):
+            self.put(Bar())
+            await self.get(Foo)
+
+    class Root(Module):
+        def __init__(self, name, dependency_file):
+            super().__init__(name, dependency_file=dependency_file)
+            self.add_module(Module0, "module0")
+            self.add_module(Module1, "module1")
+
+    for _ in range(2):
+        with capture_logs() as logs:
+            async with Root("root", str(dependency_file)) as root:
+                pass
+
+        assert not root.exceptions
+        assert root.modules["module0"]._producers == []
+        assert root.modules["module1"]._producers == []
+
+    # the dependencies of the second run were learned from the first one
+    assert sorted(
+        log["path"]
+        for log in logs
+        if log["event"] == "Ignoring learned dependency: it is part of a cycle"
+    ) == ["root.module0", "root.module1"]
+
+
+async def test_learned_dependency_without_producer(tmp_path):
+    dependency_file = tmp_path / "dependencies.json"
+    dependency_file.write_text(
+        json.dumps(
+            {"root.consumer": {"provides": [], "requires": [f"{Foo.__module__}:Foo"]}}
+        )
+    )
+
+    class Consumer(Module):
+        async def start(self):
+            pass
+
+    class Root(Module):
+        def __init__(self, name, dependency_file):
+            super().__init__(name, dependency_file=dependency_file)
+            self.add_module(Consumer, "consumer")
+
+    with capture_logs() as logs:
+        async with Root("root", str(dependency_file)) as root:
+            pass
+
+    assert not root.exceptions
+    assert any(
+        log["event"] == "Ignoring learned dependency: no module provides the type"
+        and log["path"] == "root.consumer"
+        for log in logs
+    )
+
+
+@pytest.mark.parametrize(
+    "content",
+    (
+        '{"root.consumer": {"provides": [], "requires": [',
+        '{"root.consumer": {"provides": [], "requires": ["gone_pkg.sub:Foo"]}}',
+    ),
+)
+async def test_invalid_dependency_file(tmp_path, content):
+    dependency_file = tmp_path / "dependencies.json"
+    dependency_file.write_text(content)
+
+    class Consumer(Module):
+        async def start(self):
+            pass
+
+    class Root(Module):
+        def __init__(self, name, dependency_file):
+            super().__init__(name, dependency_file=dependency_file)
+            self.add_module(Consumer, "consumer")
+
+    # the learned dependencies are only hints, they cannot prevent the application from
+    # starting
+    with capture_logs() as logs:
+        async with Root("root", str(dependency_file)) as root:
+            pass
+
+    assert not root.exceptions
+    assert any(log["log_level"] == "warning" for log in logs)
+    assert json.loads(dependency_file.read_text()) == {}
+    assert [path.name for path in tmp_path.iterdir()] == ["dependencies.json"]
+
+
+async def test_dependency_file_not_writable(tmp_path):
+    dependency_file = tmp_path / "not_a_directory" / "dependencies.json"
+
+    class Root(Module):
+        async def start(self):
+            self.put(Foo())
+
+    with capture_logs() as logs:
+        async with Root("root", dependency_file=str(dependency_file)) as root:
+            pass
+
+    assert not root.exceptions
+    assert any(log["event"] == "Could not save dependency file" for log in logs)
+
+
+async def test_deadlock_cycle():
+    class Module0(Module):
+        async def start(self):
+            await self.get(Bar, key="bar")
+            self.put(Foo())  # pragma: nocover
+
+    class Module1(Module):
+        async def start(self):
+            await self.get(Foo)
+            self.put(Bar(), key="bar")  # pragma: nocover
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name, start_timeout=10)
+            self.add_module(Module0, "module0")
+            self.add_module(Module1, "module1")
+
+    t0 = monotonic()
+    async with Root("root") as root:
+        pass
+
+    assert monotonic() - t0 < 5
+    assert len(root.exceptions) == 1
+    assert str(root.exceptions[0]) == "\n".join(
+        [
+            "Modules are deadlocked while starting:",
+            f"- root.module0 is waiting for {Bar} with key 'bar', which only blocked "
+            "modules can publish: root.module1",
+            f"- root.module1 is waiting for {Foo}, which only blocked modules can "
+            "publish: root.module0",
+            "Cycle: root.module0 -> root.module1 -> root.module0",
+        ]
+    )
+
+
+async def test_deadlock_missing_producer():
+    class Module0(Module):
+        async def prepare(self):
+            await self.get_many(Foo, Bar)
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name, prepare_timeout=10)
+            self.add_module(Module0, "module0")
+
+    t0 = monotonic()
+    async with Root("root") as root:
+        pass
+
+    assert monotonic() - t0 < 5
+    assert len(root.exceptions) == 1
+    assert str(root.exceptions[0]) == "\n".join(
+        [
+            "Modules are deadlocked while preparing:",
+            f"- root.module0 is waiting for {Foo}, which no module can publish",
+            f"- root.module0 is waiting for {Bar}, which no module can publish",
+        ]
+    )
+
+
+async def test_no_deadlock():
+    class Producer(Module):
+        provides = (Bar,)
+
+        async def start(self):
+            await sleep(0.1)
+            self.put(Bar())
+
+    class Module0(Module):
+        async def start(self):
+            await self.get(Foo)
+
+    class Module1(Module):
+        async def start(self):
+            await self.get(Bar)
+            self.put(Foo())
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Module0, "module0")
+            self.add_module(Module1, "module1")
+            self.add_module(Producer, "producer")
+
+    async with Root("root") as root:
+        pass
+
+    assert not root.exceptions
+
+
+@pytest.mark.parametrize("detect_deadlocks", (True, False))
+async def test_publish_in_background(detect_deadlocks):
+    class Producer(Module):
+        async def start(self):
+            async with create_task_group() as tg:
+                tg.start_soon(self.put_later)
+                self.done()
+
+        async def put_later(self):
+            await sleep(0.1)
+            self.put(Foo())
+
+    class Consumer(Module):
+        async def start(self):
+            await self.get(Foo)
+
+    class Root(Module):
+        def __init__(self, name, detect_deadlocks):
+            super().__init__(name, detect_deadlocks=detect_deadlocks)
+            self.add_module(Consumer, "consumer")
+            self.add_module(Producer, "producer")
+
+    # a module which is done may still publish values from its background tasks
+    async with Root("root", detect_deadlocks=detect_deadlocks) as root:
+        pass
+
+    assert not root.exceptions
+
+
+@pytest.mark.parametrize("detect_deadlocks", (True, False))
+async def test_get_in_background_while_preparing(detect_deadlocks):
+    class Producer(Module):
+        async def start(self):
+            self.put(Foo())
+
+    class Consumer(Module):
+        async def prepare(self):
+            async with create_task_group() as tg:
+                tg.start_soon(self.get, Foo)
+                self.done()
+
+    class Root(Module):
+        def __init__(self, name, detect_deadlocks):
+            super().__init__(name, detect_deadlocks=detect_deadlocks)
+            self.add_module(Consumer, "consumer")
+            self.add_module(Producer, "producer")
+
+    # a module which is done preparing may get a value published while starting
+    async with Root("root", detect_deadlocks=detect_deadlocks) as root:
+        pass
+
+    assert not root.exceptions
+
+
+async def test_get_in_background_while_running():
+    running = Event()
+    got = Event()
+
+    class Consumer(Module):
+        async def start(self):
+            async with create_task_group() as tg:
+                tg.start_soon(self.get_later)
+                self.done()
+
+        async def get_later(self):
+            await running.wait()
+            await self.get(Foo)
+            got.set()
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Consumer, "consumer")
+
+    # deadlocks are not detected once the application is running
+    async with Root("root") as root:
+        running.set()
+        await sleep(0.05)
+        root.put(Foo())
+        await got.wait()
+
+    assert not root.exceptions
+
+
+async def test_background_tasks_finished():
+    class Producer(Module):
+        async def start(self):
+            async with create_task_group() as tg:
+                tg.start_soon(sleep, 0.1)
+                self.done()
+
+    class Consumer(Module):
+        async def start(self):
+            await self.get(Foo)
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name, start_timeout=10)
+            self.add_module(Consumer, "consumer")
+            self.add_module(Producer, "producer")
+
+    t0 = monotonic()
+    async with Root("root") as root:
+        pass
+
+    # the deadlock is detected as soon as the producer cannot publish anymore
+    assert monotonic() - t0 < 5
+    assert [str(exc) for exc in root.exceptions] == [
+        "\n".join(
+            [
+                "Modules are deadlocked while starting:",
+                f"- root.consumer is waiting for {Foo}, which no module can publish",
+            ]
+        )
+    ]
+
+
+async def test_no_blocked_modules():
+    class Root(Module):
+        pass
+
+    async with Root("root") as root:
+        assert find_deadlock(root, "starting") is None
+
+
+async def test_get_ambiguous_type():
+    class SubFoo2(Foo):
+        pass
+
+    class Root(Module):
+        async def start(self):
+            self.put(SubFoo(), bases=True)
+            self.put(SubFoo2(), bases=True)
+            await self.get(Foo)
+
+    async with Root("root", stop_timeout=0.1) as root:
+        pass
+
+    assert "is ambiguous" in str(root.exceptions[0])
@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# the import time budgets (in microseconds) are well above the measured import times,
+# but below what importing e.g. structlog would cost: since they depend on the machine,
+# they are only checked if FPS_TEST_IMPORT_TIME is set
+BUDGETS = {
+    "import fps": 20_000,
+    "import fps; fps.Module": 200_000,
+    "import fps.cli._cli": 150_000,
+}
+DEFERRED = {
+    "import fps": ("structlog", "anyio", "click", "importlib.metadata", "fps._config"),
+    "import fps; fps.Module": ("structlog", "click", "importlib.metadata"),
+    "import fps.cli._cli": ("structlog", "anyio", "importlib.metadata", "fps._module"),
+}
+
+
+def get_import_times(statement: str) -> dict[str, tuple[int, bool]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            _, cumulative, name = line.removeprefix("import time:").split("|")
+            # top-level imports are indented by one space
+            import_times[name.strip()] = (int(cumulative), not name.startswith("  "))
+    return import_times
+
+
+def get_new_import_times(statement: str) -> dict[str, tuple[int, bool]]:
+    # the modules imported when Python starts are not accounted for
+    startup_modules = get_import_times("pass")
+    return {
+        name: import_time
+        for name, import_time in get_import_times(statement).items()
+        if name not in startup_modules
+    }
+
+
+@pytest.mark.parametrize("statement", DEFERRED)
+def test_deferred_imports(statement):
+    import_times = get_new_import_times(statement)
+    assert set(import_times).isdisjoint(DEFERRED[statement])
+
+
+@pytest.mark.skipif(
+    not os.environ.get("FPS_TEST_IMPORT_TIME"), reason="FPS_TEST_IMPORT_TIME is not set"
+)
+@pytest.mark.parametrize("statement", BUDGETS)
+def test_import_time(statement):  # pragma: nocover
+    import_times = get_new_import_times(statement)
+    total = sum(
+        cumulative for cumulative, top_level in import_times.values() if top_level
+    )
+    assert total < BUDGETS[statement]
+
+
+def test_lazy_attributes():
+    import fps
+
+    assert "Module" in dir(fps)
+    assert fps.Module is fps._module.Module
+    with pytest.raises(AttributeError) as excinfo:
+        fps.NotAnAttribute
+    assert str(excinfo.value) == "module 'fps' has no attribute 'NotAnAttribute'"
+
+
+def test_star_import():
+    namespace: dict = {}
+    exec("from fps import *", namespace)
+    del namespace["__builtins__"]
+
+    import fps
+
+    assert set(namespace) == set(fps.__all__)
+    assert namespace["Module"] is fps.Module
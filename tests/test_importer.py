@@ -0,0 +1,113 @@
+import importlib.metadata
+import json
+
+import pytest
+
+from fps import Module, invalidate_entry_points
+from fps._importer import (
+    _get_metadata_key,
+    get_entry_points,
+    import_from_string,
+    set_entry_points_cache,
+)
+
+
+@pytest.fixture
+def entry_points_calls(monkeypatch):
+    calls = []
+    entry_points = importlib.metadata.entry_points
+
+    def _entry_points(**kwargs):
+        calls.append(kwargs)
+        return entry_points(**kwargs)
+
+    monkeypatch.setattr(importlib.metadata, "entry_points", _entry_points)
+    set_entry_points_cache(None)
+    yield calls
+    set_entry_points_cache(None)
+
+
+def test_entry_points_index(entry_points_calls):
+    assert import_from_string("fps_module") is Module
+    assert import_from_string("fps_module") is Module
+    with pytest.raises(RuntimeError) as excinfo:
+        import_from_string("no_entry_point")
+    assert str(excinfo.value) == (
+        'Module could not be found in entry-point group "fps.modules": no_entry_point'
+    )
+    assert entry_points_calls == [{"group": "fps.modules"}]
+
+    invalidate_entry_points()
+    assert import_from_string("fps_module") is Module
+    assert len(entry_points_calls) == 2
+
+
+def test_entry_points_cache(tmp_path, monkeypatch, entry_points_calls):
+    cache_path = tmp_path / "entry_points.json"
+    set_entry_points_cache(str(cache_path))
+    assert get_entry_points()["fps_module"] == "fps:Module"
+    assert len(entry_points_calls) == 1
+    cache = json.loads(cache_path.read_text())
+    assert cache["key"] == _get_metadata_key()
+    assert cache["entry_points"]["fps_module"] == "fps:Module"
+
+    # a new process reads the entry-points from the cache
+    set_entry_points_cache(str(cache_path))
+    assert import_from_string("fps_module") is Module
+    assert len(entry_points_calls) == 1
+
+    # the cache is not valid anymore when a distribution is installed
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "foo-1.0.dist-info").mkdir()
+    set_entry_points_cache(str(cache_path))
+    assert import_from_string("fps_module") is Module
+    assert len(entry_points_calls) == 2
+
+    # or when it cannot be read
+    cache_path.write_text("{")
+    set_entry_points_cache(str(cache_path))
+    assert import_from_string("fps_module") is Module
+    assert len(entry_points_calls) == 3
+
+    invalidate_entry_points()
+    assert not cache_path.exists()
+    invalidate_entry_points()
+    assert import_from_string("fps_module") is Module
+    assert len(entry_points_calls) == 4
+
+
+def test_entry_points_cache_not_writable(tmp_path, entry_points_calls):
+    # the cache directory does not exist
+    set_entry_points_cache(str(tmp_path / "does_not_exist" / "entry_points.json"))
+    assert import_from_string("fps_module") is Module
+    # the cache path is a directory
+    set_entry_points_cache(str(tmp_path))
+    assert import_from_string("fps_module") is Module
+    assert len(entry_points_calls) == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_duplicate_entry_points(monkeypatch, entry_points_calls):
+    EntryPoint = importlib.metadata.EntryPoint
+    eps = importlib.metadata.EntryPoints(
+        [
+            EntryPoint("foo", "fps:Module", "fps.modules"),
+            EntryPoint("foo", "fps:Context", "fps.modules"),
+            EntryPoint("bar", "fps", "fps.modules"),
+        ]
+    )
+    monkeypatch.setattr(
+        importlib.metadata, "entry_points", lambda **kwargs: eps.select(**kwargs)
+    )
+    # the first entry-point with a given name takes precedence
+    assert get_entry_points() == {"foo": "fps:Module"}
+
+
+def test_metadata_key(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path / "does_not_exist"))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    key = _get_metadata_key()
+    assert _get_metadata_key() == key
+    (tmp_path / "foo.py").write_text("")
+    (tmp_path / "bar-1.0.egg-info").mkdir()
+    assert _get_metadata_key() != key
@@ -0,0 +1,200 @@
+import pytest
+from anyio import Event, create_task_group, sleep
+
+from fps import Module
+
+pytestmark = pytest.mark.anyio
+
+
+class Foo:
+    pass
+
+
+class Bar:
+    pass
+
+
+def make_modules(events):
+    class Submodule(Module):
+        async def prepare(self):
+            events.append(f"{self.path} prepare")
+
+        async def start(self):
+            events.append(f"{self.path} start")
+
+        async def stop(self):
+            events.append(f"{self.path} stop")
+
+    class LazySubmodule(Submodule):
+        provides = (Bar,)
+        lazy = True
+
+    class LazyModule(Submodule):
+        provides = (Foo,)
+        lazy = True
+
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule, "submodule")
+            self.add_module(LazySubmodule, "lazy_submodule")
+
+        async def start(self):
+            await super().start()
+            self.put(Foo())
+
+    return LazyModule
+
+
+async def test_dormant():
+    events = []
+    LazyModule = make_modules(events)
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(LazyModule, "lazy")
+
+    async with Root("root") as root:
+        pass
+
+    assert not root.exceptions
+    assert events == []
+
+
+async def test_activate_while_starting():
+    events = []
+    LazyModule = make_modules(events)
+
+    class Consumer(Module):
+        async def start(self):
+            await self.get(Foo)
+            events.append("consumer got foo")
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(LazyModule, "lazy")
+            self.add_module(Consumer, "consumer")
+
+    async with Root("root") as root:
+        assert root.modules["lazy"].started.is_set()
+        assert not root.modules["lazy"].modules["lazy_submodule"].started.is_set()
+
+    assert not root.exceptions
+    # the consumer can get the value as soon as the lazy module has published it
+    assert set(events[:2]) == {"root.lazy prepare", "root.lazy.submodule prepare"}
+    assert events.index("root.lazy start") < events.index("consumer got foo")
+    assert set(events[2:5]) == {
+        "root.lazy start",
+        "root.lazy.submodule start",
+        "consumer got foo",
+    }
+    assert set(events[5:]) == {"root.lazy stop", "root.lazy.submodule stop"}
+
+
+async def test_activate_when_running():
+    events = []
+    LazyModule = make_modules(events)
+    got_foo = Event()
+
+    class Consumer(Module):
+        async def start(self):
+            async with create_task_group() as tg:
+                tg.start_soon(self.get_foo)
+                self.done()
+
+        async def get_foo(self):
+            await sleep(0.1)
+            await self.get_many(Foo)
+            got_foo.set()
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(LazyModule, "lazy")
+            self.add_module(Consumer, "consumer")
+
+    async with Root("root") as root:
+        assert events == []
+        await got_foo.wait()
+        assert "root.lazy start" in events
+
+    assert not root.exceptions
+    assert "root.lazy stop" in events
+
+
+async def test_activate_required():
+    events = []
+    LazyModule = make_modules(events)
+
+    class Consumer(Module):
+        requires = (Foo,)
+
+        async def prepare(self):
+            events.append("consumer prepare")
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(LazyModule, "lazy")
+            self.add_module(Consumer, "consumer")
+
+    async with Root("root") as root:
+        pass
+
+    assert not root.exceptions
+    assert events.index("root.lazy prepare") < events.index("consumer prepare")
+
+
+async def test_lazy_without_provides():
+    class LazyModule(Module):
+        lazy = True
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(LazyModule, "lazy")
+
+    with pytest.raises(RuntimeError) as excinfo:
+        async with Root("root"):
+            pass  # pragma: nocover
+
+    assert (
+        str(excinfo.value)
+        == "Lazy module must declare the types it provides: root.lazy"
+    )
+
+
+@pytest.mark.parametrize("phase", ("prepare", "start"))
+async def test_activation_timeout(phase):
+    class LazyModule(Module):
+        provides = (Foo,)
+        lazy = True
+
+        async def prepare(self):
+            if phase == "prepare":
+                await sleep(1)
+
+        async def start(self):
+            if phase == "start":
+                await sleep(1)
+
+    class Consumer(Module):
+        async def start(self):
+            async with create_task_group() as tg:
+                tg.start_soon(self.get, Foo)
+                self.done()
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(LazyModule, "lazy", prepare_timeout=0.1, start_timeout=0.1)
+            self.add_module(Consumer, "consumer")
+
+    async with Root("root") as root:
+        await root._exit.wait()
+
+    phase_str = "preparing" if phase == "prepare" else "starting"
+    assert [str(exc) for exc in root.exceptions] == [
+        f"Module timed out while {phase_str}: root.lazy"
+    ]
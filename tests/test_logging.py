@@ -0,0 +1,128 @@
+import logging
+
+import pytest
+import structlog
+from anyio import to_thread
+from structlog.testing import capture_logs
+
+import fps._logging
+from fps import Module, configure_logging
+from fps._logging import get_logger, is_debug_enabled
+
+
+@pytest.fixture(autouse=True)
+def restore_logging(monkeypatch):
+    # these tests change the global logging configuration, which must be restored for
+    # the other tests (configuring logging replaces the standard library's handlers with
+    # one that writes to this test's captured output)
+    monkeypatch.setattr(fps._logging, "_loggers", fps._logging._loggers)
+    monkeypatch.setattr(fps._logging, "_debug_enabled", fps._logging._debug_enabled)
+    configured = structlog.is_configured()
+    config = structlog.get_config()
+    root_logger = logging.getLogger()
+    handlers = root_logger.handlers[:]
+    level = root_logger.level
+    # detach the handlers, otherwise configuring logging would close them
+    root_logger.handlers.clear()
+    yield
+    structlog.reset_defaults()
+    if configured:
+        structlog.configure(**config)
+    root_logger.handlers[:] = handlers
+    root_logger.setLevel(level)
+
+
+@pytest.fixture
+def unconfigured_logging():
+    fps._logging._loggers = {}
+    fps._logging._debug_enabled = None
+    structlog.reset_defaults()
+
+
+def test_configure_logging_on_first_use(unconfigured_logging):
+    log = get_logger()
+    assert not structlog.is_configured()
+    log.debug("Not configured yet")
+    assert structlog.is_configured()
+    assert structlog.get_config()["wrapper_class"] is structlog.stdlib.BoundLogger
+
+
+def test_logging_already_configured(unconfigured_logging):
+    processors = [structlog.processors.JSONRenderer()]
+    structlog.configure(processors=processors)
+    get_logger().debug("Configured by the application")
+    assert structlog.get_config()["processors"] == processors
+
+
+def test_logger_name(caplog):
+    from fps._module import log
+
+    # the standard library's logger is named after the module which logs
+    log.warning("Logged by a module")
+    get_logger("fps.foo").warning("Logged by another module")
+    assert [record.name for record in caplog.records] == ["fps._module", "fps.foo"]
+    assert "Logged by a module" in caplog.records[0].getMessage()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("log_level", ("DEBUG", "info"))
+async def test_debug_gate(log_level):
+    class Foo:
+        pass
+
+    class Bar:
+        pass
+
+    class Baz:
+        pass
+
+    class Root(Module):
+        async def start(self):
+            self.put(Foo())
+            self.put_factory(Bar)
+            self.put_pool(Baz)
+            await self.get(Foo)
+            await self.get_many(Bar, Baz)
+            await to_thread.run_sync(self.get_from_thread, Foo)
+
+    configure_logging(log_level)
+    assert is_debug_enabled() is (log_level == "DEBUG")
+    with capture_logs() as cap_logs:
+        async with Root("root") as root:
+            pass
+
+    assert not root.exceptions
+    events = [log["event"] for log in cap_logs]
+    hot_path_events = [
+        "Module added value",
+        "Module added value factory",
+        "Module added value pool",
+        "Module getting value",
+        "Module got value",
+        "Module getting values",
+        "Module got values",
+    ]
+    if log_level == "DEBUG":
+        # borrowing from a thread logs that the value was got
+        assert [event for event in events if event in hot_path_events] == (
+            hot_path_events + ["Module got value"]
+        )
+        logs = {log["event"]: log for log in cap_logs}
+        assert logs["Module added value"]["types"] == [Foo]
+        assert logs["Module added value factory"]["types"] == [Bar]
+    else:
+        assert not set(events) & set(hot_path_events)
+
+
+def test_debug_gate_numeric_level():
+    configure_logging(logging.WARNING)
+    assert not is_debug_enabled()
+    configure_logging(logging.DEBUG)
+    assert is_debug_enabled()
+    configure_logging()
+    assert not is_debug_enabled()
+
+
+def test_debug_gate_unknown_logger(unconfigured_logging):
+    structlog.configure(wrapper_class=structlog.BoundLogger)
+    assert is_debug_enabled()
@@ -0,0 +1,217 @@
+from contextlib import contextmanager
+
+import pytest
+from anyio import Event, create_task_group, sleep
+from structlog.testing import capture_logs
+
+from fps import Module
+
+pytestmark = pytest.mark.anyio
+
+
+class BaseService:
+    pass
+
+
+class Service(BaseService):
+    def __init__(self, incarnation):
+        self.incarnation = incarnation
+
+
+async def test_restart_on_failure():
+    events = []
+
+    @contextmanager
+    def resource():
+        yield
+        events.append("resource exited")
+
+    class Child(Module):
+        async def start(self):
+            events.append("child start")
+
+        async def stop(self):
+            events.append("child stop")
+
+    class Poller(Module):
+        restart = "on-failure"
+        restart_backoff = 0.01
+
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Child, "child")
+            self.incarnation = 0
+
+        async def start(self):
+            self.incarnation += 1
+            incarnation = self.incarnation
+            events.append("poller start")
+            self.context_manager(resource())
+            self.add_teardown_callback(lambda: events.append("teardown callback"))
+            self.put(
+                Service(incarnation),
+                teardown_callback=lambda: events.append(f"teardown {incarnation}"),
+                bases=True,
+            )
+            async with create_task_group() as tg:
+                tg.start_soon(self.poll)
+                self.done()
+
+        async def poll(self):
+            await sleep(0.05)
+            if self.incarnation == 1:
+                raise RuntimeError("poll failed")
+
+        async def stop(self):
+            events.append("poller stop")
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Poller, "poller")
+
+    with capture_logs() as cap_logs:
+        async with Root("root") as root:
+            service = await root.get(Service)
+            assert service.incarnation == 1
+            await sleep(0.2)
+            # the old service is kept until it is dropped
+            assert "teardown 1" not in events
+            root.drop(service)
+            await sleep(0.01)
+            assert "teardown 1" in events
+            service = await root.get(BaseService)
+            assert service.incarnation == 2
+            assert events.count("poller start") == 2
+            assert events.count("child start") == 2
+            assert events.count("child stop") == 1
+            assert events.count("poller stop") == 1
+            assert events.count("resource exited") == 1
+            assert events.count("teardown callback") == 1
+
+    assert not root.exceptions
+    restarts = [log for log in cap_logs if log["event"] == "Module failed, restarting"]
+    assert len(restarts) == 1
+    assert restarts[0]["path"] == "root.poller"
+    assert restarts[0]["delay"] == 0.01
+    assert "poll failed" in repr(restarts[0]["exc_info"])
+
+
+async def test_restart_while_starting():
+    starts = []
+
+    class Poller(Module):
+        restart = "on-failure"
+        restart_backoff = 0.01
+
+        async def start(self):
+            starts.append(len(starts))
+            if len(starts) == 1:
+                raise RuntimeError("start failed")
+
+        async def stop(self):
+            raise RuntimeError("stop failed")
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Poller, "poller")
+
+    with capture_logs() as cap_logs:
+        async with Root("root") as root:
+            assert root.modules["poller"].started.is_set()
+
+    assert starts == [0, 1]
+    assert [log["event"] for log in cap_logs if log["log_level"] == "error"] == [
+        "Module failed while stopping for restart",
+    ]
+
+
+async def test_max_restarts():
+    starts = []
+
+    class Poller(Module):
+        restart = "on-failure"
+        restart_backoff = 0.01
+        max_restarts = 2
+
+        async def start(self):
+            starts.append(len(starts))
+            raise RuntimeError("start failed")
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Poller, "poller")
+
+    with capture_logs() as cap_logs:
+        async with Root("root") as root:
+            pass
+
+    # exponential backoff
+    delays = [log["delay"] for log in cap_logs if "delay" in log]
+    assert delays == [0.01, 0.02]
+    assert starts == [0, 1, 2]
+    assert [str(exc) for exc in root.exceptions] == ["start failed"]
+    too_many = [
+        log for log in cap_logs if log["event"] == "Module failed too many times"
+    ]
+    assert too_many[0]["restarts"] == 2
+
+
+async def test_exit_while_restarting():
+    running = Event()
+
+    class Poller(Module):
+        restart = "on-failure"
+        restart_backoff = 10
+
+        async def start(self):
+            async with create_task_group() as tg:
+                tg.start_soon(self.fail)
+                self.done()
+
+        async def fail(self):
+            # fail once the application is running
+            await running.wait()
+            raise RuntimeError("failed")
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Poller, "poller")
+
+    async with Root("root") as root:
+        running.set()
+        await sleep(0.1)
+        root.exit_app()
+
+    assert not root.exceptions
+
+
+async def test_restart_prepare_timeout():
+    prepares = []
+
+    class Poller(Module):
+        restart = "on-failure"
+        restart_backoff = 0.01
+
+        async def prepare(self):
+            prepares.append(len(prepares))
+            if len(prepares) == 2:
+                await sleep(1)
+
+        async def start(self):
+            raise RuntimeError("start failed")
+
+    class Root(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Poller, "poller", prepare_timeout=0.1)
+
+    async with Root("root") as root:
+        pass
+
+    assert [str(exc) for exc in root.exceptions] == [
+        "Module timed out while preparing: root.poller"
+    ]
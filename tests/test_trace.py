@@ -0,0 +1,121 @@
+import json
+
+import pytest
+from anyio import create_task_group, sleep
+
+from fps import Module, trace_startup
+from fps._trace import _no_span, span
+
+pytestmark = pytest.mark.anyio
+
+
+class Foo:
+    pass
+
+
+class Submodule(Module):
+    async def prepare(self):
+        await sleep(0.05)
+
+    async def start(self):
+        await sleep(0.05)
+        self.put(Foo())
+
+
+class Root(Module):
+    def __init__(self, name):
+        super().__init__(name)
+        self.add_module("test_trace:Submodule", "submodule")
+
+    async def start(self):
+        await self.get(Foo)
+        await self.get_many(Foo)
+
+
+def get_spans(trace):
+    tracks = {
+        event["tid"]: event["args"]["name"]
+        for event in trace["traceEvents"]
+        if event["ph"] == "M"
+    }
+    return {
+        (tracks[event["tid"]], event["name"]): event["dur"]
+        for event in trace["traceEvents"]
+        if event["ph"] == "X"
+    }
+
+
+async def test_trace_startup(tmp_path):
+    trace_path = tmp_path / "trace.json"
+
+    with trace_startup(str(trace_path)):
+        async with Root("root"):
+            pass
+
+    spans = get_spans(json.loads(trace_path.read_text()))
+    foo = f"{Foo.__module__}.Foo"
+    assert set(spans) == {
+        ("fps", "import test_trace:Submodule"),
+        ("fps", "initialize"),
+        ("fps", "instantiate root.submodule"),
+        ("root", "prepare"),
+        ("root", "start"),
+        ("root", f"get {foo}"),
+        ("root", f"get_many {foo}"),
+        ("root", "stop"),
+        ("root.submodule", "prepare"),
+        ("root.submodule", "start"),
+        ("root.submodule", "stop"),
+    }
+    # durations are in microseconds
+    assert spans[("root.submodule", "prepare")] >= 50_000
+    assert spans[("root.submodule", "start")] >= 50_000
+    assert spans[("root", f"get {foo}")] >= 50_000
+
+
+async def test_trace_until_running(tmp_path):
+    trace_path = tmp_path / "trace.json"
+
+    class Module0(Module):
+        async def start(self):
+            async with create_task_group() as tg:
+                tg.start_soon(sleep, float("inf"))
+                await sleep(0.05)
+                self.done()
+
+    with trace_startup(str(trace_path), until_running=True):
+        async with Module0("root") as root:
+            # the trace is saved once the application is running
+            assert span("get", "root") is _no_span
+            spans = get_spans(json.loads(trace_path.read_text()))
+            root.exit_app()
+
+    # the "start" span ends when the module is done
+    assert set(spans) == {("fps", "initialize"), ("root", "prepare"), ("root", "start")}
+    assert 50_000 <= spans[("root", "start")] < 1_000_000
+    assert span("get", "root") is _no_span
+
+
+async def test_trace_failed_phase(tmp_path):
+    trace_path = tmp_path / "trace.json"
+
+    class Module0(Module):
+        async def prepare(self):
+            raise RuntimeError("prepare failed")
+
+    with trace_startup(str(trace_path), until_running=True):
+        async with Module0("root") as root:
+            pass
+
+    assert root.exceptions
+    spans = get_spans(json.loads(trace_path.read_text()))
+    assert set(spans) == {("fps", "initialize"), ("root", "prepare"), ("root", "stop")}
+
+
+async def test_no_trace(tmp_path):
+    assert span("prepare", "root") is _no_span
+
+    with trace_startup(str(tmp_path / "trace.json")):
+        assert span("prepare", "root") is not _no_span
+
+    assert span("prepare", "root") is _no_span
@@ -1,7 +1,10 @@
+from time import perf_counter
+
 import pytest
 
-from anyio import sleep
+from anyio import create_task_group, sleep, to_thread
 from fps import Module
+from structlog.testing import capture_logs
 
 pytestmark = pytest.mark.anyio
 
@@ -293,3 +296,329 @@ async def test_all_freed():
         "dropped",
         "all freed",
     ]
+
+
+async def test_put_pool():
+    connections = []
+    torn_down = []
+
+    class Connection:
+        def __init__(self):
+            connections.append(self)
+
+    class Submodule0(Module):
+        async def start(self):
+            self.put_pool(Connection, max_size=1, teardown_callback=torn_down.append)
+
+        async def stop(self):
+            await self.freed(Connection)
+
+    class Submodule1(Module):
+        async def start(self):
+            self.connection = await self.get(Connection)
+            await sleep(0.1)
+            self.drop(self.connection)
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+            self.add_module(Submodule1, "submodule1")
+            self.add_module(Submodule1, "submodule2")
+
+    async with Module0("module0") as module0:
+        pass
+
+    submodule1 = module0.modules["submodule1"]
+    submodule2 = module0.modules["submodule2"]
+    assert len(connections) == 1
+    assert submodule1.connection is submodule2.connection is connections[0]
+    assert torn_down == connections
+
+
+async def test_put_factory():
+    built = []
+
+    class Service0:
+        def __init__(self):
+            built.append(self)
+
+    class Service1(Service0):
+        pass
+
+    class Submodule0(Module):
+        async def start(self):
+            self.put_factory(Service0)
+            self.put_factory(Service1)
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+
+        async def start(self):
+            self.service = await self.get(Service0)
+            self.drop(self.service)
+
+    async with Module0("module0") as module0:
+        pass
+
+    assert built == [module0.service]
+    assert type(module0.service) is Service0
+
+
+async def test_get_many():
+    class Value0:
+        pass
+
+    class Value1:
+        pass
+
+    class Submodule0(Module):
+        async def start(self):
+            self.put(Value0())
+            await sleep(0.01)
+            self.put(Value1())
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+
+        async def start(self):
+            self.values = await self.get_many(Value1, Value0)
+            try:
+                await self.get_many(Value0, str, timeout=0.01)
+            except TimeoutError:
+                pass
+
+        async def stop(self):
+            self.drop_all()
+
+    async with Module0("module0") as module0:
+        pass
+
+    assert [type(value) for value in module0.values] == [Value1, Value0]
+    assert not module0.exceptions
+
+
+async def test_concurrent_teardown():
+    outputs = []
+
+    class Value0:
+        def __init__(self, name):
+            self.name = name
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc_value, exc_tb):
+            await sleep(0.05)
+            outputs.append(f"exit {self.name}")
+
+    class Module0(Module):
+        async def start(self):
+            await self.async_context_manager(Value0("value0"))
+            await self.async_context_manager(Value0("value1"))
+
+            async def teardown0():
+                await sleep(0.1)
+                outputs.append("teardown0")
+
+            async def teardown1():
+                await sleep(0.1)
+                outputs.append("teardown1")
+
+            self.add_teardown_callback(teardown0)
+            self.add_teardown_callback(teardown1)
+            self.add_teardown_callback(
+                lambda: outputs.append("teardown2"), after=[teardown0]
+            )
+
+    t0 = perf_counter()
+    async with Module0("module0", concurrent_teardown=True):
+        pass
+
+    assert perf_counter() - t0 < 0.3
+    # context managers are still exited one after the other, in reverse order
+    assert outputs[:2] == ["exit value1", "exit value0"]
+    assert sorted(outputs[2:4]) == ["teardown0", "teardown1"]
+    assert outputs[4] == "teardown2"
+
+
+async def test_put_bases():
+    class Base:
+        pass
+
+    class Sub(Base):
+        pass
+
+    class Submodule0(Module):
+        async def start(self):
+            self.put(Sub(), bases=True)
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+
+        async def start(self):
+            self.value = await self.get(Base)
+            self.drop(self.value)
+
+    async with Module0("module0") as module0:
+        pass
+
+    assert type(module0.value) is Sub
+
+
+async def test_put_key():
+    class Submodule0(Module):
+        async def start(self):
+            self.put("foo", key="foo")
+            self.put("bar", key="bar")
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+
+        async def start(self):
+            self.values = [
+                await self.get(str, key="bar"),
+                await self.get(str, key="foo"),
+            ]
+            for value in self.values:
+                self.drop(value)
+
+    async with Module0("module0") as module0:
+        pass
+
+    assert module0.values == ["bar", "foo"]
+
+
+async def test_get_exclusive():
+    class Submodule0(Module):
+        async def start(self):
+            self.put({})
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+
+        async def start(self):
+            self.value = await self.get(dict, mode="exclusive")
+            self.value["foo"] = "bar"
+            self.drop(self.value)
+
+    async with Module0("module0") as module0:
+        pass
+
+    assert module0.value == {"foo": "bar"}
+
+
+async def test_lease():
+    class Submodule0(Module):
+        async def start(self):
+            self.put("foo", lease=0.01)
+            self.put_factory(list, lease=0.01)
+            self.put_pool(dict, lease=0.01)
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+
+        async def start(self):
+            await self.get(str)
+            await self.get(list, lease=0.01)
+            # the borrow whose lease expired is reclaimed by the next exclusive borrower
+            self.value = await self.get(str, mode="exclusive", lease=1)
+            self.values = await self.get_many(list, dict)
+
+    with capture_logs() as cap_logs:
+        async with Module0("module0") as module0:
+            pass
+
+    assert module0.value == "foo"
+    assert module0.values == ([], {})
+    assert {
+        "event": "Reclaimed value whose lease expired",
+        "borrower": "module0",
+        "log_level": "warning",
+    } in cap_logs
+
+
+async def test_replace():
+    torn_down = []
+
+    class Submodule0(Module):
+        async def start(self):
+            self.value = "foo"
+            self.put(self.value, teardown_callback=lambda: torn_down.append("foo"))
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+
+        async def start(self):
+            self.values = [await self.get(str)]
+            self.drop(self.values[0])
+            submodule0 = self.modules["submodule0"]
+            await submodule0.replace(
+                "foo", "bar", teardown_callback=lambda: torn_down.append("bar")
+            )
+            self.values.append(await self.get(str))
+            with pytest.raises(RuntimeError) as excinfo:
+                await submodule0.replace("foo", "baz")
+            assert str(excinfo.value) == "Value not found"
+
+    async with Module0("module0") as module0:
+        pass
+
+    assert not module0.exceptions
+    assert module0.values == ["foo", "bar"]
+    assert torn_down == ["foo", "bar"]
+
+
+async def test_get_from_thread():
+    class Submodule0(Module):
+        async def start(self):
+            self.put("foo")
+            async with create_task_group() as tg:
+                tg.start_soon(self.put_later)
+                self.done()
+
+        async def put_later(self):
+            await sleep(0.01)
+            self.put(1)
+
+    class Module0(Module):
+        def __init__(self, name):
+            super().__init__(name)
+            self.add_module(Submodule0, "submodule0")
+            self.gets = 0
+
+        async def start(self):
+            # the published value is borrowed without waiting
+            self.value = await to_thread.run_sync(self.borrow, str)
+            self.later_value = await to_thread.run_sync(self.borrow, int)
+
+        async def get(self, *args, **kwargs):
+            self.gets += 1
+            return await super().get(*args, **kwargs)
+
+        def borrow(self, value_type):
+            value = self.get_from_thread(value_type)
+            self.drop_from_thread(value)
+            return value
+
+    async with Module0("module0") as module0:
+        pass
+
+    assert not module0.exceptions
+    assert module0.value == "foo"
+    assert module0.later_value == 1
+    assert module0.gets == 1